@@ -3,13 +3,24 @@ Telegram Bot API client using native HTTP requests via httpx.
 No external Telegram bot libraries used.
 """
 
+import asyncio
+import contextlib
 import logging
-from typing import Any, Optional
+import re
+import time
+import weakref
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterator, Optional
 import httpx
+import orjson
+from pydantic import ValidationError
 from pydantic_ai_telegram.models import (
+    UPDATE_ADAPTER,
+    UPDATES_ADAPTER,
     TelegramUpdate,
     TelegramFile,
-    APIResponse,
 )
 
 logger = logging.getLogger(__name__)
@@ -18,14 +29,143 @@ logger = logging.getLogger(__name__)
 class TelegramAPIError(Exception):
     """Exception raised for Telegram API errors."""
     
-    def __init__(self, error_code: int, description: str) -> None:
+    def __init__(
+        self,
+        error_code: int,
+        description: str,
+        retry_after: Optional[int] = None,
+    ) -> None:
         self.error_code = error_code
         self.description = description
+        self.retry_after = retry_after  # Seconds to wait, set on 429 responses
         super().__init__(f"Telegram API Error {error_code}: {description}")
 
 
 # Telegram API limits
 MAX_MESSAGE_LENGTH = 4096
+MAX_CONCURRENT_SENDS = 28  # Stay below the ~30 messages/second global limit
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+DOWNLOAD_WRITE_SIZE = 1024 * 1024  # Chunks buffered per write, so each thread hop writes a lot
+MAX_CONCURRENT_DOWNLOADS = 8  # Large downloads share the API connection pool
+CHAT_ACTION_INTERVAL = 4.0  # Telegram shows a chat action for about 5 seconds
+
+# Retries for rate limits (429), failed connections and (idempotent methods only) server errors (5xx)
+MAX_REQUEST_ATTEMPTS = 4
+RETRY_BACKOFF_BASE = 0.5
+RETRY_BACKOFF_MAX = 8.0
+
+# Methods safe to repeat after a server error; a 5xx may arrive after
+# Telegram already acted on the request, and a repeated sendMessage
+# would deliver a duplicate
+_IDEMPOTENT_METHODS = frozenset({"getUpdates", "getFile", "getMe", "sendChatAction"})
+
+# getFile results; Telegram keeps download links valid for at least an hour
+FILE_CACHE_TTL = 3000
+FILE_CACHE_SIZE = 1024
+
+# Natural split boundaries for long messages, in order of preference
+_SPLIT_BOUNDARIES = (
+    (re.compile(r'(?=\n\n)'), 2),  # Paragraph (lookahead keeps overlapping matches)
+    (re.compile(r'\n'), 1),  # Line
+    (re.compile(r' '), 1),  # Word
+)
+_LEADING_WHITESPACE = re.compile(r'\s*')
+
+# Characters outside the BMP take two UTF-16 code units
+_ASTRAL_CHAR = re.compile('[\U00010000-\U0010ffff]')
+
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+def _window_end(astral: list[int], start: int, stop: int, max_length: int) -> int:
+    """
+    Find the largest index such that text[start:index] fits in max_length UTF-16 units.
+    
+    Args:
+        astral: Sorted indexes of characters outside the BMP
+        start: Start of the window
+        stop: Length of the text
+        max_length: Maximum window size in UTF-16 code units
+        
+    Returns:
+        End index of the window (at most stop)
+    """
+    hi = min(start + max_length, stop)
+    base = bisect_left(astral, start)
+    if bisect_left(astral, hi) == base:
+        return hi
+    
+    # Binary search, as each wide character shrinks the window by one
+    lo = start
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if mid - start + bisect_left(astral, mid) - base <= max_length:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def _backoff_delay(attempt: int) -> float:
+    """Exponential backoff delay before retrying after the given attempt."""
+    return min(RETRY_BACKOFF_BASE * 2 ** (attempt - 1), RETRY_BACKOFF_MAX)
+
+
+class AsyncTokenBucket:
+    """
+    Token bucket for pacing requests from async code.
+    Holds up to `capacity` tokens, refilled at `rate` tokens per second.
+    """
+    
+    def __init__(self, capacity: float, rate: float) -> None:
+        """
+        Initialize a full bucket.
+        
+        Args:
+            capacity: Maximum number of tokens (burst size)
+            rate: Tokens added per second
+        """
+        self.capacity = capacity
+        self.rate = rate
+        self._tokens = float(capacity)
+        self._last = time.monotonic()
+        self._lock = asyncio.Lock()  # Waiters are served in order
+    
+    def _refill(self) -> None:
+        """Add the tokens accrued since the last refill."""
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+    
+    @property
+    def full(self) -> bool:
+        """Whether the bucket is at capacity, i.e. has been idle."""
+        self._refill()
+        return self._tokens >= self.capacity
+    
+    async def acquire(self, n: float = 1) -> None:
+        """
+        Take tokens from the bucket, waiting until enough are available.
+        
+        Args:
+            n: Number of tokens to take
+        """
+        async with self._lock:
+            self._refill()
+            while self._tokens < n:
+                await asyncio.sleep((n - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= n
+    
+    def drain(self, seconds: float) -> None:
+        """
+        Empty the bucket so no tokens are available for the given time.
+        
+        Args:
+            seconds: How long acquire should block
+        """
+        self._refill()
+        self._tokens = min(self._tokens, 0.0) - seconds * self.rate
 
 
 class TelegramAPI:
@@ -44,24 +184,72 @@ class TelegramAPI:
         """
         self.bot_token = bot_token
         self.base_url = f"https://api.telegram.org/bot{bot_token}"
+        self._file_base_url = f"https://api.telegram.org/file/bot{bot_token}"
         self.timeout = timeout
-        self.client: Optional[httpx.AsyncClient] = None
+        # Outbound API calls and downloads share one pool; long polling gets its
+        # own so a pending getUpdates never holds a connection needed for sends.
+        self._api_client: Optional[httpx.AsyncClient] = None
+        self._poll_client: Optional[httpx.AsyncClient] = None
+        
+        # Per-chat locks keep the chunks of concurrent replies from interleaving;
+        # entries disappear once no send for that chat is pending.
+        self._chat_locks: weakref.WeakValueDictionary[int, asyncio.Lock] = (
+            weakref.WeakValueDictionary()
+        )
+        self._send_semaphore = asyncio.Semaphore(MAX_CONCURRENT_SENDS)
+        self._download_semaphore = asyncio.Semaphore(MAX_CONCURRENT_DOWNLOADS)
+        
+        # LRU of file_id -> (fetch time, TelegramFile)
+        self._file_cache: OrderedDict[str, tuple[float, TelegramFile]] = OrderedDict()
         
     async def __aenter__(self) -> 'TelegramAPI':
         """Async context manager entry."""
-        self.client = httpx.AsyncClient(timeout=self.timeout)
+        await self.startup()
         return self
         
     async def __aexit__(self, exc_type: Any, exc_val: Any, exc_tb: Any) -> None:
         """Async context manager exit."""
-        if self.client:
-            await self.client.aclose()
+        await self.close()
+    
+    async def startup(self) -> None:
+        """
+        Create the persistent HTTP/2 clients used for API calls and long polling.
+        Safe to call more than once.
+        """
+        if self._api_client is None:
+            self._api_client = httpx.AsyncClient(
+                base_url=self.base_url,
+                http2=True,
+                timeout=httpx.Timeout(self.timeout, connect=5.0),
+                limits=httpx.Limits(
+                    max_keepalive_connections=32,
+                    max_connections=64,
+                    keepalive_expiry=90,
+                ),
+            )
+        if self._poll_client is None:
+            self._poll_client = httpx.AsyncClient(
+                base_url=self.base_url,
+                http2=True,
+                timeout=httpx.Timeout(self.timeout, connect=5.0),
+                limits=httpx.Limits(
+                    max_keepalive_connections=4,
+                    max_connections=4,
+                    keepalive_expiry=90,
+                ),
+            )
     
-    async def _ensure_client(self) -> httpx.AsyncClient:
-        """Ensure HTTP client is initialized."""
-        if self.client is None:
-            self.client = httpx.AsyncClient(timeout=self.timeout)
-        return self.client
+    def _get_client(self, poll: bool = False) -> httpx.AsyncClient:
+        """
+        Get the API client (or the long-polling client if poll is True).
+        
+        Raises:
+            RuntimeError: If startup() has not been called
+        """
+        client = self._poll_client if poll else self._api_client
+        if client is None:
+            raise RuntimeError("TelegramAPI is not started. Call startup() first.")
+        return client
     
     async def _request(
         self,
@@ -69,6 +257,7 @@ class TelegramAPI:
         data: Optional[dict[str, Any]] = None,
         files: Optional[dict[str, Any]] = None,
         timeout: Optional[int] = None,
+        poll: bool = False,
     ) -> dict[str, Any]:
         """
         Make a request to Telegram Bot API.
@@ -78,6 +267,7 @@ class TelegramAPI:
             data: Request data
             files: Files to upload
             timeout: Request timeout (overrides default)
+            poll: Use the dedicated long-polling client
             
         Returns:
             API response as dictionary
@@ -85,50 +275,93 @@ class TelegramAPI:
         Raises:
             TelegramAPIError: If API returns an error
         """
-        client = await self._ensure_client()
-        url = f"{self.base_url}/{method}"
+        # Relative to the client's base_url
+        client = self._get_client(poll)
         
-        try:
-            if files:
-                response = await client.post(
-                    url,
-                    data=data or {},
-                    files=files,
-                    timeout=timeout or self.timeout,
-                )
-            else:
-                response = await client.post(
-                    url,
-                    json=data or {},
-                    timeout=timeout or self.timeout,
-                )
-            
-            response.raise_for_status()
-            result = response.json()
-            
-            # Parse response using Pydantic model
-            api_response = APIResponse(**result)
-            
-            if not api_response.ok:
-                raise TelegramAPIError(
-                    api_response.error_code or 0,
-                    api_response.description or "Unknown error"
-                )
-            
-            return result
-            
-        except httpx.HTTPStatusError as e:
-            logger.error(f"HTTP error calling {method}: {e}")
-            raise TelegramAPIError(e.response.status_code, str(e))
-        except httpx.RequestError as e:
-            logger.error(f"Request error calling {method}: {e}")
-            raise TelegramAPIError(0, str(e))
+        # Uploaded file objects can't be replayed, so don't retry those
+        attempts = 1 if files else MAX_REQUEST_ATTEMPTS
+        retry_server_errors = method in _IDEMPOTENT_METHODS
+        
+        for attempt in range(1, attempts + 1):
+            try:
+                if files:
+                    response = await client.post(
+                        method,
+                        data=data or {},
+                        files=files,
+                        timeout=timeout or self.timeout,
+                    )
+                else:
+                    response = await client.post(
+                        method,
+                        content=orjson.dumps(data or {}),
+                        headers=_JSON_HEADERS,
+                        timeout=timeout or self.timeout,
+                    )
+                
+                if response.status_code >= 500 and retry_server_errors and attempt < attempts:
+                    delay = _backoff_delay(attempt)
+                    logger.warning(
+                        "Server error %s calling %s, retrying in %ss",
+                        response.status_code,
+                        method,
+                        delay,
+                    )
+                    await asyncio.sleep(delay)
+                    continue
+                
+                # Rate limit responses carry retry_after in the JSON body
+                if response.status_code != 429:
+                    response.raise_for_status()
+                result = orjson.loads(response.content)
+                
+                # Plain dict check; validating the APIResponse wrapper on every
+                # call is pure overhead on the success path
+                if not result.get("ok"):
+                    retry_after = (result.get("parameters") or {}).get("retry_after")
+                    
+                    if result.get("error_code") == 429 and retry_after and attempt < attempts:
+                        logger.warning(
+                            "Rate limited calling %s, retrying in %ss", method, retry_after
+                        )
+                        await asyncio.sleep(retry_after)
+                        continue
+                    
+                    raise TelegramAPIError(
+                        result.get("error_code") or 0,
+                        result.get("description") or "Unknown error",
+                        retry_after=retry_after,
+                    )
+                
+                return result
+                
+            except httpx.HTTPStatusError as e:
+                logger.error("HTTP error calling %s: %s", method, e)
+                raise TelegramAPIError(e.response.status_code, str(e))
+            except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout) as e:
+                # The request never reached Telegram, so it is safe to send again
+                if attempt < attempts:
+                    delay = _backoff_delay(attempt)
+                    logger.warning(
+                        "Connection error calling %s, retrying in %ss: %s", method, delay, e
+                    )
+                    await asyncio.sleep(delay)
+                    continue
+                logger.error("Request error calling %s: %s", method, e)
+                raise TelegramAPIError(0, str(e))
+            except httpx.RequestError as e:
+                logger.error("Request error calling %s: %s", method, e)
+                raise TelegramAPIError(0, str(e))
+        
+        # Not reached: the last attempt always returns or raises
+        raise TelegramAPIError(0, f"Failed to call {method}")
     
     async def get_updates(
         self,
         offset: Optional[int] = None,
         limit: int = 100,
-        timeout: int = 30,
+        timeout: int = 50,
+        allowed_updates: Optional[list[str]] = None,
     ) -> list[TelegramUpdate]:
         """
         Get incoming updates using long polling.
@@ -137,6 +370,7 @@ class TelegramAPI:
             offset: Identifier of the first update to be returned
             limit: Maximum number of updates to retrieve
             timeout: Timeout for long polling
+            allowed_updates: Update types to receive (None keeps the previous setting)
             
         Returns:
             List of TelegramUpdate objects
@@ -149,14 +383,27 @@ class TelegramAPI:
         if offset is not None:
             data["offset"] = offset
         
-        result = await self._request("getUpdates", data=data, timeout=timeout + 5)
+        if allowed_updates is not None:
+            data["allowed_updates"] = allowed_updates
+        
+        result = await self._request(
+            "getUpdates", data=data, timeout=timeout + 5, poll=True
+        )
+        
+        updates_data = result.get("result", [])
+        
+        try:
+            return UPDATES_ADAPTER.validate_python(updates_data)
+        except ValidationError:
+            pass
         
+        # Fall back to per-update parsing so one bad update doesn't drop the batch
         updates = []
-        for update_data in result.get("result", []):
+        for update_data in updates_data:
             try:
-                updates.append(TelegramUpdate(**update_data))
+                updates.append(UPDATE_ADAPTER.validate_python(update_data))
             except Exception as e:
-                logger.error(f"Failed to parse update: {e}")
+                logger.error("Failed to parse update: %s", e)
                 continue
         
         return updates
@@ -168,51 +415,77 @@ class TelegramAPI:
         
         Args:
             text: The text to split
-            max_length: Maximum length per chunk (default: 4096)
+            max_length: Maximum length per chunk in UTF-16 code units (default: 4096)
             
         Returns:
             List of text chunks
         """
-        if len(text) <= max_length:
-            return [text]
+        return [text[start:end] for start, end in self._split_message_offsets(text, max_length)]
+    
+    def _split_message_offsets(
+        self,
+        text: str,
+        max_length: int = MAX_MESSAGE_LENGTH,
+    ) -> Iterator[tuple[int, int]]:
+        """
+        Yield (start, end) offsets of the chunks _split_message would return,
+        so callers can slice each chunk only when they need it.
+        
+        Telegram measures length in UTF-16 code units, so characters outside
+        the BMP (most emoji) count twice.
+        
+        Args:
+            text: The text to split
+            max_length: Maximum length per chunk in UTF-16 code units (default: 4096)
+            
+        Yields:
+            Start and end index of each chunk
+        """
+        if len(text) <= max_length // 2:
+            yield 0, len(text)
+            return
+        
+        astral = [m.start() for m in _ASTRAL_CHAR.finditer(text)]
+        if len(text) + len(astral) <= max_length:
+            yield 0, len(text)
+            return
+        
+        # Locate every candidate boundary in one pass per kind, then pick the
+        # last one in each window with a binary search instead of rescanning.
+        boundaries = [
+            ([m.start() for m in pattern.finditer(text)], width)
+            for pattern, width in _SPLIT_BOUNDARIES
+        ]
+        min_split = max_length // 2
         
-        chunks: list[str] = []
-        remaining = text
+        cursor = 0
+        end = len(text)
         
-        while remaining:
-            if len(remaining) <= max_length:
-                chunks.append(remaining)
+        while cursor < end:
+            limit = _window_end(astral, cursor, end, max_length)
+            if limit == end:
+                yield cursor, end
                 break
             
             # Find the best split point
-            chunk = remaining[:max_length]
-            
-            # Try to split at double newline (paragraph)
-            split_pos = chunk.rfind('\n\n')
-            if split_pos > max_length // 2:
-                chunks.append(remaining[:split_pos].rstrip())
-                remaining = remaining[split_pos:].lstrip()
-                continue
-            
-            # Try to split at single newline
-            split_pos = chunk.rfind('\n')
-            if split_pos > max_length // 2:
-                chunks.append(remaining[:split_pos].rstrip())
-                remaining = remaining[split_pos:].lstrip()
-                continue
-            
-            # Try to split at space
-            split_pos = chunk.rfind(' ')
-            if split_pos > max_length // 2:
-                chunks.append(remaining[:split_pos].rstrip())
-                remaining = remaining[split_pos:].lstrip()
-                continue
-            
-            # Force split at max_length (no good boundary found)
-            chunks.append(remaining[:max_length])
-            remaining = remaining[max_length:]
-        
-        return chunks
+            for positions, width in boundaries:
+                # Last boundary that fits entirely inside the window
+                idx = bisect_right(positions, limit - width) - 1
+                if idx >= 0 and positions[idx] - cursor > min_split:
+                    split_pos = positions[idx]
+                    # Drop trailing whitespace from the chunk
+                    chunk_end = split_pos
+                    while chunk_end > cursor and text[chunk_end - 1].isspace():
+                        chunk_end -= 1
+                    yield cursor, chunk_end
+                    # Skip the whitespace the next chunk would start with
+                    whitespace = _LEADING_WHITESPACE.match(text, split_pos)
+                    cursor = whitespace.end() if whitespace else split_pos
+                    break
+            else:
+                # Force split at max_length (no good boundary found)
+                yield cursor, limit
+                cursor = limit
 
     async def send_message(
         self,
@@ -220,41 +493,57 @@ class TelegramAPI:
         text: str,
         reply_to_message_id: Optional[int] = None,
         parse_mode: Optional[str] = None,
+        before_chunk: Optional[Callable[[], Awaitable[None]]] = None,
     ) -> dict[str, Any]:
         """
         Send a text message. Automatically splits long messages into chunks.
         
+        Chunks of one reply are sent in order while holding a per-chat lock, and
+        the number of in-flight sends across all chats is capped.
+        
         Args:
             chat_id: Unique identifier for the target chat
             text: Text of the message to be sent
             reply_to_message_id: If specified, the first message is sent as a reply
             parse_mode: Mode for parsing entities (Markdown, HTML)
+            before_chunk: Awaited before each chunk is sent, e.g. to pace
+                every chunk by rate limits
             
         Returns:
             API response (from the last message sent)
         """
-        # Split message if it exceeds Telegram's limit
-        chunks = self._split_message(text)
+        result: dict[str, Any] = {}
         
-        if len(chunks) > 1:
-            logger.debug(f"Splitting long message ({len(text)} chars) into {len(chunks)} chunks")
+        chat_lock = self._chat_locks.get(chat_id)
+        if chat_lock is None:
+            chat_lock = asyncio.Lock()
+            self._chat_locks[chat_id] = chat_lock
         
-        result: dict[str, Any] = {}
+        async with chat_lock:
+            # Split message if it exceeds Telegram's limit, slicing each chunk
+            # only right before it is sent
+            i = -1
+            for i, (start, end) in enumerate(self._split_message_offsets(text)):
+                data: dict[str, Any] = {
+                    "chat_id": chat_id,
+                    "text": text[start:end],
+                }
+                
+                # Only reply to the original message for the first chunk
+                if reply_to_message_id and i == 0:
+                    data["reply_to_message_id"] = reply_to_message_id
+                
+                if parse_mode:
+                    data["parse_mode"] = parse_mode
+                
+                if before_chunk:
+                    await before_chunk()
+                
+                async with self._send_semaphore:
+                    result = await self._request("sendMessage", data=data)
         
-        for i, chunk in enumerate(chunks):
-            data: dict[str, Any] = {
-                "chat_id": chat_id,
-                "text": chunk,
-            }
-            
-            # Only reply to the original message for the first chunk
-            if reply_to_message_id and i == 0:
-                data["reply_to_message_id"] = reply_to_message_id
-            
-            if parse_mode:
-                data["parse_mode"] = parse_mode
-            
-            result = await self._request("sendMessage", data=data)
+        if i > 0 and logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Split long message (%d chars) into %d chunks", len(text), i + 1)
         
         return result
     
@@ -280,9 +569,44 @@ class TelegramAPI:
         
         return await self._request("sendChatAction", data=data)
     
+    @contextlib.asynccontextmanager
+    async def typing_context(
+        self,
+        chat_id: int,
+        action: str = "typing",
+    ) -> AsyncIterator[None]:
+        """
+        Keep a chat action visible while the block runs.
+        
+        A single background task sends the action right away and repeats it
+        every CHAT_ACTION_INTERVAL seconds until the block exits.
+        
+        Args:
+            chat_id: Unique identifier for the target chat
+            action: Type of action (typing, upload_photo, upload_document, etc.)
+        """
+        task = asyncio.create_task(self._chat_action_loop(chat_id, action))
+        try:
+            yield
+        finally:
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+    
+    async def _chat_action_loop(self, chat_id: int, action: str) -> None:
+        """Send a chat action repeatedly until cancelled."""
+        while True:
+            try:
+                await self.send_chat_action(chat_id, action)
+            except Exception as e:
+                # Best effort: a lost indicator must never fail the reply
+                logger.debug("Failed to send chat action to %s: %s", chat_id, e)
+            await asyncio.sleep(CHAT_ACTION_INTERVAL)
+    
     async def get_file(self, file_id: str) -> TelegramFile:
         """
         Get basic info about a file and prepare it for downloading.
+        Results are cached for FILE_CACHE_TTL seconds.
         
         Args:
             file_id: File identifier
@@ -290,14 +614,28 @@ class TelegramAPI:
         Returns:
             TelegramFile object
         """
+        entry = self._file_cache.get(file_id)
+        if entry and time.monotonic() - entry[0] < FILE_CACHE_TTL:
+            self._file_cache.move_to_end(file_id)
+            return entry[1]
+        
         data = {"file_id": file_id}
         result = await self._request("getFile", data=data)
         
-        return TelegramFile(**result["result"])
+        file_info = TelegramFile.model_validate(result["result"])
+        
+        self._file_cache[file_id] = (time.monotonic(), file_info)
+        self._file_cache.move_to_end(file_id)
+        if len(self._file_cache) > FILE_CACHE_SIZE:
+            self._file_cache.popitem(last=False)
+        
+        return file_info
     
     async def download_file(self, file_path: str) -> bytes:
         """
-        Download a file from Telegram servers.
+        Download a file from Telegram servers into memory.
+        
+        Prefer download_file_to when the content only needs to end up on disk.
         
         Args:
             file_path: File path returned by get_file
@@ -305,15 +643,52 @@ class TelegramAPI:
         Returns:
             File content as bytes
         """
-        client = await self._ensure_client()
-        url = f"https://api.telegram.org/file/bot{self.bot_token}/{file_path}"
+        client = self._get_client()
+        url = f"{self._file_base_url}/{file_path}"
         
         try:
-            response = await client.get(url)
+            async with self._download_semaphore:
+                response = await client.get(url)
             response.raise_for_status()
             return response.content
         except httpx.HTTPError as e:
-            logger.error(f"Error downloading file: {e}")
+            logger.error("Error downloading file: %s", e)
+            raise TelegramAPIError(0, f"Failed to download file: {e}")
+    
+    async def download_file_to(self, file_path: str, dest: str | Path) -> None:
+        """
+        Stream a file from Telegram servers directly to disk.
+        At most about DOWNLOAD_WRITE_SIZE bytes are held in memory at a time.
+        
+        Args:
+            file_path: File path returned by get_file
+            dest: Local path to write the file to
+        """
+        client = self._get_client()
+        url = f"{self._file_base_url}/{file_path}"
+        
+        try:
+            async with self._download_semaphore, client.stream("GET", url) as response:
+                response.raise_for_status()
+                
+                # Open, write and close in worker threads, never on the event loop
+                f = await asyncio.to_thread(open, dest, "wb")
+                try:
+                    pending: list[bytes] = []
+                    pending_size = 0
+                    async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                        pending.append(chunk)
+                        pending_size += len(chunk)
+                        if pending_size >= DOWNLOAD_WRITE_SIZE:
+                            await asyncio.to_thread(f.writelines, pending)
+                            pending = []
+                            pending_size = 0
+                    if pending:
+                        await asyncio.to_thread(f.writelines, pending)
+                finally:
+                    await asyncio.to_thread(f.close)
+        except httpx.HTTPError as e:
+            logger.error("Error downloading file: %s", e)
             raise TelegramAPIError(0, f"Failed to download file: {e}")
     
     async def get_me(self) -> dict[str, Any]:
@@ -325,9 +700,27 @@ class TelegramAPI:
         """
         return await self._request("getMe")
     
+    async def warmup(self) -> dict[str, Any]:
+        """
+        Call getMe through both connection pools at once, so the first poll
+        and the first reply reuse an open connection instead of paying for
+        DNS, TCP and TLS setup.
+        
+        Returns:
+            Bot information (getMe result)
+        """
+        bot_info, _ = await asyncio.gather(
+            self._request("getMe"),
+            self._request("getMe", poll=True),
+        )
+        return bot_info
+    
     async def close(self) -> None:
-        """Close the HTTP client."""
-        if self.client:
-            await self.client.aclose()
-            self.client = None
+        """Close the HTTP clients."""
+        if self._api_client:
+            await self._api_client.aclose()
+            self._api_client = None
+        if self._poll_client:
+            await self._poll_client.aclose()
+            self._poll_client = None
 
@@ -5,13 +5,22 @@ Handles downloading, processing, and automatic cleanup of files.
 
 import asyncio
 import logging
+import mimetypes
+import secrets
 import tempfile
 from pathlib import Path
-from typing import Optional
+from types import MappingProxyType
+from typing import Awaitable, Callable, Optional
 import os
 
 logger = logging.getLogger(__name__)
 
+# Upper bound on concurrent deletions during cleanup
+MAX_CONCURRENT_DELETES = 32
+
+# System temp directory, resolved once instead of on every mkstemp call
+_TMP_ROOT = Path(tempfile.gettempdir())
+
 
 class BinaryHandler:
     """
@@ -19,6 +28,25 @@ class BinaryHandler:
     Ensures proper cleanup after processing.
     """
     
+    # Common MIME type mappings
+    _MIME_EXT = MappingProxyType({
+        "audio/ogg": ".ogg",
+        "audio/mpeg": ".mp3",
+        "audio/mp4": ".m4a",
+        "audio/wav": ".wav",
+        "audio/webm": ".webm",
+        "image/jpeg": ".jpg",
+        "image/png": ".png",
+        "image/gif": ".gif",
+        "image/webp": ".webp",
+        "application/pdf": ".pdf",
+        "application/zip": ".zip",
+        "application/json": ".json",
+        "text/plain": ".txt",
+        "video/mp4": ".mp4",
+        "video/webm": ".webm",
+    })
+    
     def __init__(self, temp_dir: Optional[str] = None) -> None:
         """
         Initialize binary handler.
@@ -26,8 +54,14 @@ class BinaryHandler:
         Args:
             temp_dir: Custom temporary directory (uses system default if None)
         """
-        self.temp_dir = Path(temp_dir) if temp_dir else Path(tempfile.gettempdir())
-        self.temp_dir.mkdir(parents=True, exist_ok=True)
+        if temp_dir:
+            self.temp_dir = Path(temp_dir)
+            self.temp_dir.mkdir(parents=True, exist_ok=True)
+        else:
+            self.temp_dir = _TMP_ROOT
+        
+        # Plain string for the per-file os.path calls
+        self._temp_dir_str = str(self.temp_dir)
     
     def create_temp_file(
         self,
@@ -44,11 +78,10 @@ class BinaryHandler:
         Returns:
             Path to temporary file
         """
-        fd, path = tempfile.mkstemp(
-            suffix=suffix,
-            prefix=prefix,
-            dir=str(self.temp_dir),
-        )
+        # Random 128-bit name created exclusively, same guarantees as mkstemp
+        # without its per-call temp dir lookup and retry loop
+        path = os.path.join(self._temp_dir_str, f"{prefix}{secrets.token_hex(16)}{suffix}")
+        fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o600)
         # Close the file descriptor
         os.close(fd)
         
@@ -73,28 +106,39 @@ class BinaryHandler:
         """
         file_path = self.create_temp_file(suffix=suffix, prefix=prefix)
         
-        # Write file asynchronously
-        loop = asyncio.get_event_loop()
-        await loop.run_in_executor(
-            None,
-            self._write_file_sync,
-            file_path,
-            content,
-        )
+        # Write file without blocking the event loop
+        await asyncio.to_thread(file_path.write_bytes, content)
         
-        logger.debug(f"Saved temporary file: {file_path}")
+        logger.debug("Saved temporary file: %s", file_path)
         return file_path
     
-    def _write_file_sync(self, file_path: Path, content: bytes) -> None:
+    async def save_stream(
+        self,
+        downloader: Callable[[Path], Awaitable[None]],
+        suffix: str = "",
+        prefix: str = "telegram_bot_",
+    ) -> Path:
         """
-        Write file synchronously (runs in thread pool).
+        Create a temporary file and let a downloader stream content into it.
         
         Args:
-            file_path: Path to write to
-            content: Content to write
+            downloader: Coroutine function that writes the content to the given path
+            suffix: File suffix
+            prefix: File prefix
+            
+        Returns:
+            Path to saved file (deleted again if the download fails)
         """
-        with open(file_path, "wb") as f:
-            f.write(content)
+        file_path = self.create_temp_file(suffix=suffix, prefix=prefix)
+        
+        try:
+            await downloader(file_path)
+        except BaseException:
+            await self.delete_file(file_path)
+            raise
+        
+        logger.debug("Saved temporary file: %s", file_path)
+        return file_path
     
     async def delete_file(self, file_path: str | Path) -> None:
         """
@@ -103,18 +147,13 @@ class BinaryHandler:
         Args:
             file_path: Path to file to delete
         """
-        path = Path(file_path)
-        
-        if not path.exists():
-            logger.debug(f"File already deleted or doesn't exist: {path}")
-            return
-        
         try:
-            loop = asyncio.get_event_loop()
-            await loop.run_in_executor(None, path.unlink)
-            logger.debug(f"Deleted temporary file: {path}")
+            await asyncio.to_thread(os.unlink, file_path)
+            logger.debug("Deleted temporary file: %s", file_path)
+        except FileNotFoundError:
+            logger.debug("File already deleted or doesn't exist: %s", file_path)
         except Exception as e:
-            logger.error(f"Failed to delete file {path}: {e}")
+            logger.error("Failed to delete file %s: %s", file_path, e)
     
     async def cleanup_old_files(self, max_age_seconds: int = 3600) -> int:
         """
@@ -132,18 +171,30 @@ class BinaryHandler:
         current_time = time.time()
         
         try:
-            for file_path in self.temp_dir.glob("telegram_bot_*"):
-                if file_path.is_file():
-                    file_age = current_time - file_path.stat().st_mtime
-                    
-                    if file_age > max_age_seconds:
-                        await self.delete_file(file_path)
-                        deleted_count += 1
+            # scandir returns type and stat info with each entry
+            with os.scandir(self._temp_dir_str) as entries:
+                old_files = [
+                    entry.path
+                    for entry in entries
+                    if entry.name.startswith("telegram_bot_")
+                    and entry.is_file()
+                    and current_time - entry.stat().st_mtime > max_age_seconds
+                ]
+            
+            # Delete concurrently, with a cap on in-flight deletions
+            semaphore = asyncio.Semaphore(MAX_CONCURRENT_DELETES)
+            
+            async def delete(file_path: str) -> None:
+                async with semaphore:
+                    await self.delete_file(file_path)
+            
+            await asyncio.gather(*(delete(file_path) for file_path in old_files))
+            deleted_count = len(old_files)
         except Exception as e:
-            logger.error(f"Error during cleanup: {e}")
+            logger.error("Error during cleanup: %s", e)
         
         if deleted_count > 0:
-            logger.info(f"Cleaned up {deleted_count} old temporary files")
+            logger.info("Cleaned up %d old temporary files", deleted_count)
         
         return deleted_count
     
@@ -160,31 +211,14 @@ class BinaryHandler:
         """
         # Try to get extension from filename first
         if filename:
-            ext = Path(filename).suffix
-            if ext:
+            ext = os.path.splitext(filename)[1]
+            if len(ext) > 1:
                 return ext
         
-        # Common MIME type mappings
-        mime_extensions = {
-            "audio/ogg": ".ogg",
-            "audio/mpeg": ".mp3",
-            "audio/mp4": ".m4a",
-            "audio/wav": ".wav",
-            "audio/webm": ".webm",
-            "image/jpeg": ".jpg",
-            "image/png": ".png",
-            "image/gif": ".gif",
-            "image/webp": ".webp",
-            "application/pdf": ".pdf",
-            "application/zip": ".zip",
-            "application/json": ".json",
-            "text/plain": ".txt",
-            "video/mp4": ".mp4",
-            "video/webm": ".webm",
-        }
-        
-        if mime_type and mime_type in mime_extensions:
-            return mime_extensions[mime_type]
+        if mime_type:
+            ext = self._MIME_EXT.get(mime_type) or mimetypes.guess_extension(mime_type)
+            if ext:
+                return ext
         
         return ".bin"  # Default binary extension
 
@@ -4,14 +4,18 @@ Main TelegramAgent class that wraps Pydantic AI agents with Telegram bot capabil
 
 import asyncio
 import logging
-from typing import Any, Optional
+import os
+import re
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Optional
 
 from pydantic_ai import Agent
 from pydantic_ai.messages import BinaryContent
 
-from pydantic_ai_telegram.api import TelegramAPI, TelegramAPIError
+from pydantic_ai_telegram.api import AsyncTokenBucket, TelegramAPI, TelegramAPIError
 from pydantic_ai_telegram.models import TelegramMessage, TelegramUpdate, MessageContent
 from pydantic_ai_telegram.conversation import ConversationManager
+from pydantic_ai_telegram.store import ConversationStore
 from pydantic_ai_telegram.binary_handler import BinaryHandler
 from pydantic_ai_telegram.handlers import (
     TextHandler,
@@ -25,6 +29,138 @@ from pydantic_ai_telegram.transcription.base import TranscriptionService
 
 logger = logging.getLogger(__name__)
 
+# Update types handled by process_update; Telegram skips everything else
+ALLOWED_UPDATES = ["message", "edited_message"]
+
+# Updates queued or in progress before polling pauses for workers to catch up
+MAX_PENDING_UPDATES = 1000
+
+# Telegram clients split pasted text longer than 4096 characters into several
+# messages. A text at least this long is likely continued by the next one,
+# which is awaited for up to SPLIT_TEXT_WINDOW seconds and merged into it.
+SPLIT_TEXT_THRESHOLD = 4000
+SPLIT_TEXT_WINDOW = 1.5
+
+# Outgoing message pacing: Telegram allows ~30 messages/second overall
+# and about one message per second in a single chat
+GLOBAL_SEND_RATE = 30.0
+CHAT_SEND_RATE = 1.0
+
+# Delay after a failed poll doubles from 1s up to this cap
+MAX_POLL_BACKOFF = 60.0
+
+# Static command responses
+_START_MSG = (
+    "👋 Hello! I'm your AI assistant.\n\n"
+    "You can send me:\n"
+    "• Text messages\n"
+    "• Voice messages (will be transcribed)\n"
+    "• Images\n"
+    "• Documents\n\n"
+    "Commands:\n"
+    "/reset - Clear conversation history\n"
+    "/tokens - Show token count\n"
+    "/help - Show this message"
+)
+_HELP_MSG = (
+    "Available commands:\n"
+    "/start - Welcome message\n"
+    "/reset - Clear conversation history\n"
+    "/tokens - Show current token count\n"
+    "/help - Show this message\n\n"
+    "Send me any message and I'll respond!"
+)
+_RESET_MSG = "✅ Conversation history cleared!"
+
+# Command name: everything after the leading / up to the first whitespace
+_COMMAND = re.compile(r'/(\S*)')
+
+
+def _poll_backoff(failures: int) -> float:
+    """Delay before polling again after consecutive failures."""
+    return min(2.0 ** (failures - 1), MAX_POLL_BACKOFF)
+
+
+def _make_no_transcription(whisper_model: Optional[str]) -> None:
+    """Transcription factory for "none"."""
+    logger.info("Voice transcription disabled")
+    return None
+
+
+def _make_local_whisper(whisper_model: Optional[str]) -> Optional[TranscriptionService]:
+    """Transcription factory for "local": Whisper running on this machine."""
+    try:
+        from pydantic_ai_telegram.transcription import (
+            LocalWhisperTranscription,
+            check_ffmpeg_installed,
+        )
+        
+        # Check ffmpeg (with helpful error)
+        if not check_ffmpeg_installed():
+            logger.warning(
+                "⚠️  ffmpeg is not installed. Voice transcription will not work.\n"
+                "   Install: brew install ffmpeg (macOS) or sudo apt install ffmpeg (Ubuntu)"
+            )
+            return None
+        
+        model = whisper_model or "turbo"
+        logger.info("Setting up local Whisper transcription (model: %s)", model)
+        
+        return LocalWhisperTranscription(model_name=model)
+        
+    except ImportError as e:
+        logger.warning(
+            "Could not setup local Whisper: %s\n"
+            "Install with: pip install pydantic-ai-telegram[whisper]",
+            e,
+        )
+        return None
+    except Exception as e:
+        logger.error("Failed to setup local Whisper: %s", e)
+        return None
+
+
+def _make_openai_transcription(whisper_model: Optional[str]) -> Optional[TranscriptionService]:
+    """Transcription factory for "openai": the OpenAI Whisper API."""
+    try:
+        from pydantic_ai_telegram.transcription import OpenAITranscription
+        
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            logger.warning("OPENAI_API_KEY not set, cannot use OpenAI transcription")
+            return None
+        
+        logger.info("Setting up OpenAI transcription")
+        return OpenAITranscription(api_key=api_key)
+        
+    except ImportError:
+        logger.warning(
+            "Could not import OpenAI transcription.\n"
+            "Install with: pip install pydantic-ai-telegram[openai]"
+        )
+        return None
+    except Exception as e:
+        logger.error("Failed to setup OpenAI transcription: %s", e)
+        return None
+
+
+# Transcription service names accepted by TelegramAgent, mapped to their factories
+_TRANSCRIPTION_FACTORIES: dict[str, Callable[[Optional[str]], Optional[TranscriptionService]]] = {
+    "none": _make_no_transcription,
+    "local": _make_local_whisper,
+    "openai": _make_openai_transcription,
+}
+
+
+def _is_plain_text(message: Optional[TelegramMessage]) -> bool:
+    """Check whether a message is text only, with no media and no command."""
+    return bool(
+        message
+        and message.text
+        and message.text[0] != "/"
+        and not (message.voice or message.audio or message.photo or message.document)
+    )
+
 
 class TelegramAgent:
     """
@@ -42,6 +178,7 @@ class TelegramAgent:
         allowed_usernames: Optional[list[str] | str] = None,
         max_history: Optional[int | str] = None,
         temp_dir: Optional[str] = None,
+        conversation_store: Optional[ConversationStore] = None,
     ) -> None:
         """
         Initialize the Telegram bot agent.
@@ -55,6 +192,7 @@ class TelegramAgent:
             allowed_usernames: List of allowed usernames, comma-separated string, or None (allow all)
             max_history: Maximum conversation history to maintain (default: 50)
             temp_dir: Directory for temporary files
+            conversation_store: Persistent store for conversations (default: in memory only)
         """
         self.bot_token = bot_token
         self.agent = agent
@@ -65,10 +203,10 @@ class TelegramAgent:
         )
         
         # Parse allowed_chat_ids
-        self.allowed_chat_ids = self._parse_chat_ids(allowed_chat_ids)
+        self.allowed_chat_ids: Optional[frozenset[int]] = self._parse_chat_ids(allowed_chat_ids)
         
         # Parse allowed_usernames
-        self.allowed_usernames = self._parse_usernames(allowed_usernames)
+        self.allowed_usernames: Optional[frozenset[str]] = self._parse_usernames(allowed_usernames)
         
         # Parse max_history
         if max_history is None:
@@ -77,12 +215,15 @@ class TelegramAgent:
             try:
                 max_history = int(max_history)
             except ValueError:
-                logger.warning(f"Invalid max_history value: {max_history}, using default 50")
+                logger.warning("Invalid max_history value: %s, using default 50", max_history)
                 max_history = 50
         
         # Initialize components
         self.api = TelegramAPI(bot_token)
-        self.conversation_manager = ConversationManager(max_history=max_history)
+        self.conversation_manager = ConversationManager(
+            max_history=max_history,
+            store=conversation_store,
+        )
         self.binary_handler = BinaryHandler(temp_dir=temp_dir)
         
         # Initialize message handlers
@@ -90,12 +231,12 @@ class TelegramAgent:
         self.voice_handler = VoiceHandler(
             self.api,
             self.binary_handler,
-            transcription_service,
+            self.transcription_service,
         )
         self.audio_handler = AudioHandler(
             self.api,
             self.binary_handler,
-            transcription_service,
+            self.transcription_service,
         )
         self.photo_handler = PhotoHandler(self.api, self.binary_handler)
         self.document_handler = DocumentHandler(self.api, self.binary_handler)
@@ -104,45 +245,71 @@ class TelegramAgent:
         self.running = False
         self.last_update_id = 0
         
-        # Cleanup task
+        # Background loops, cancelled by stop()
         self._cleanup_task: Optional[asyncio.Task[None]] = None
+        self._polling_task: Optional[asyncio.Task[None]] = None
+        self._warmup_task: Optional[asyncio.Task[None]] = None
+        
+        # Temp file deletions still running, referenced so they aren't garbage collected
+        self._pending_deletes: set[asyncio.Task[None]] = set()
+        
+        # Per-chat update queues and the workers draining them
+        self._chat_queues: dict[int, asyncio.Queue[TelegramUpdate]] = {}
+        self._chat_workers: dict[int, asyncio.Task[None]] = {}
+        self._pending_updates = asyncio.Semaphore(MAX_PENDING_UPDATES)
+        
+        # Outgoing message rate limits
+        self._global_bucket = AsyncTokenBucket(GLOBAL_SEND_RATE, GLOBAL_SEND_RATE)
+        self._chat_buckets: dict[int, AsyncTokenBucket] = {}
+        
+        # Bot commands, keyed by name without the leading /
+        self._commands: dict[str, Callable[[int, int], Awaitable[None]]] = {
+            "start": self._cmd_start,
+            "help": self._cmd_help,
+            "reset": self._cmd_reset,
+            "tokens": self._cmd_tokens,
+        }
     
-    def _parse_chat_ids(self, chat_ids: Optional[list[int] | str]) -> Optional[list[int]]:
-        """Parse chat IDs from string or list."""
+    def _parse_chat_ids(self, chat_ids: Optional[list[int] | str]) -> Optional[frozenset[int]]:
+        """Parse chat IDs from string or list into a set for fast lookups."""
         if chat_ids is None or chat_ids == "":
             return None
         
         if isinstance(chat_ids, list):
-            return chat_ids
+            return frozenset(chat_ids) or None
         
         # Parse comma-separated string
-        result = []
+        result = set()
         for item in str(chat_ids).split(','):
             item = item.strip()
             if item and item.isdigit():
-                result.append(int(item))
+                result.add(int(item))
         
-        return result if result else None
+        return frozenset(result) if result else None
     
-    def _parse_usernames(self, usernames: Optional[list[str] | str]) -> Optional[list[str]]:
-        """Parse usernames from string or list."""
+    def _parse_usernames(self, usernames: Optional[list[str] | str]) -> Optional[frozenset[str]]:
+        """
+        Parse usernames from string or list into a set for fast lookups.
+        Usernames are stored without @ and lowercased, as Telegram
+        usernames are case-insensitive.
+        """
         if usernames is None or usernames == "":
             return None
         
-        if isinstance(usernames, list):
-            return usernames
+        if isinstance(usernames, str):
+            # Parse comma-separated string
+            usernames = usernames.split(',')
         
-        # Parse comma-separated string
-        result = []
-        for item in str(usernames).split(','):
+        result = set()
+        for item in usernames:
             item = item.strip()
             if item:
                 # Remove @ if present
                 if item.startswith('@'):
                     item = item[1:]
-                result.append(item)
+                result.add(item.lower())
         
-        return result if result else None
+        return frozenset(result) if result else None
     
     def _setup_transcription(
         self,
@@ -163,70 +330,19 @@ class TelegramAgent:
         if isinstance(transcription_service, TranscriptionService):
             return transcription_service
         
-        # If None or "none", no transcription
-        if transcription_service is None or transcription_service == "none":
-            logger.info("Voice transcription disabled")
-            return None
+        # If None, no transcription
+        if transcription_service is None:
+            return _make_no_transcription(whisper_model)
         
         # Setup based on string
         service_type = str(transcription_service).lower()
+        factory = _TRANSCRIPTION_FACTORIES.get(service_type)
         
-        if service_type == "local":
-            try:
-                from pydantic_ai_telegram.transcription import (
-                    LocalWhisperTranscription,
-                    check_ffmpeg_installed,
-                )
-                
-                # Check ffmpeg (with helpful error)
-                if not check_ffmpeg_installed():
-                    logger.warning(
-                        "⚠️  ffmpeg is not installed. Voice transcription will not work.\n"
-                        "   Install: brew install ffmpeg (macOS) or sudo apt install ffmpeg (Ubuntu)"
-                    )
-                    return None
-                
-                model = whisper_model or "turbo"
-                logger.info(f"Setting up local Whisper transcription (model: {model})")
-                
-                return LocalWhisperTranscription(model_name=model)
-                
-            except ImportError as e:
-                logger.warning(
-                    f"Could not setup local Whisper: {e}\n"
-                    "Install with: pip install pydantic-ai-telegram[whisper]"
-                )
-                return None
-            except Exception as e:
-                logger.error(f"Failed to setup local Whisper: {e}")
-                return None
-        
-        elif service_type == "openai":
-            try:
-                from pydantic_ai_telegram.transcription import OpenAITranscription
-                import os
-                
-                api_key = os.getenv("OPENAI_API_KEY")
-                if not api_key:
-                    logger.warning("OPENAI_API_KEY not set, cannot use OpenAI transcription")
-                    return None
-                
-                logger.info("Setting up OpenAI transcription")
-                return OpenAITranscription(api_key=api_key)
-                
-            except ImportError:
-                logger.warning(
-                    "Could not import OpenAI transcription.\n"
-                    "Install with: pip install pydantic-ai-telegram[openai]"
-                )
-                return None
-            except Exception as e:
-                logger.error(f"Failed to setup OpenAI transcription: {e}")
-                return None
-        
-        else:
-            logger.warning(f"Unknown transcription service: {service_type}")
+        if factory is None:
+            logger.warning("Unknown transcription service: %s", service_type)
             return None
+        
+        return factory(whisper_model)
     
     def is_authorized(self, message: TelegramMessage) -> bool:
         """
@@ -245,7 +361,7 @@ class TelegramAgent:
         # Check username
         if self.allowed_usernames and message.from_user:
             username = message.from_user.username
-            if not username or username not in self.allowed_usernames:
+            if not username or username.lower() not in self.allowed_usernames:
                 return False
         
         return True
@@ -259,50 +375,77 @@ class TelegramAgent:
             chat_id: Chat ID
             message_id: Message ID to reply to
         """
-        if command == "start":
-            response = (
-                "👋 Hello! I'm your AI assistant.\n\n"
-                "You can send me:\n"
-                "• Text messages\n"
-                "• Voice messages (will be transcribed)\n"
-                "• Images\n"
-                "• Documents\n\n"
-                "Commands:\n"
-                "/reset - Clear conversation history\n"
-                "/tokens - Show token count\n"
-                "/help - Show this message"
-            )
-            await self.api.send_message(chat_id, response, reply_to_message_id=message_id)
-        
-        elif command == "help":
-            response = (
-                "Available commands:\n"
-                "/start - Welcome message\n"
-                "/reset - Clear conversation history\n"
-                "/tokens - Show current token count\n"
-                "/help - Show this message\n\n"
-                "Send me any message and I'll respond!"
-            )
-            await self.api.send_message(chat_id, response, reply_to_message_id=message_id)
-        
-        elif command == "reset":
-            self.conversation_manager.reset_conversation(chat_id)
-            response = "✅ Conversation history cleared!"
-            await self.api.send_message(chat_id, response, reply_to_message_id=message_id)
-        
-        elif command == "tokens":
-            token_count = self.conversation_manager.get_token_count(chat_id)
-            message_count = self.conversation_manager.get_message_count(chat_id)
-            response = (
-                f"📊 Conversation Statistics:\n"
-                f"• Messages: {message_count}\n"
-                f"• Tokens: {token_count}"
-            )
-            await self.api.send_message(chat_id, response, reply_to_message_id=message_id)
+        handler = self._commands.get(command)
         
-        else:
+        if handler is None:
             response = f"Unknown command: /{command}\nUse /help to see available commands."
-            await self.api.send_message(chat_id, response, reply_to_message_id=message_id)
+            await self._send(chat_id, response, reply_to_message_id=message_id)
+            return
+        
+        await handler(chat_id, message_id)
+    
+    async def _cmd_start(self, chat_id: int, message_id: int) -> None:
+        """Send the welcome message."""
+        await self._send(chat_id, _START_MSG, reply_to_message_id=message_id)
+    
+    async def _cmd_help(self, chat_id: int, message_id: int) -> None:
+        """Send the list of commands."""
+        await self._send(chat_id, _HELP_MSG, reply_to_message_id=message_id)
+    
+    async def _cmd_reset(self, chat_id: int, message_id: int) -> None:
+        """Clear the chat's conversation history."""
+        self.conversation_manager.reset_conversation(chat_id)
+        await self.conversation_manager.save_conversation(chat_id)
+        await self._send(chat_id, _RESET_MSG, reply_to_message_id=message_id)
+    
+    async def _cmd_tokens(self, chat_id: int, message_id: int) -> None:
+        """Send the chat's message and token counts."""
+        await self.conversation_manager.load_conversation(chat_id)
+        token_count = self.conversation_manager.get_token_count(chat_id)
+        message_count = self.conversation_manager.get_message_count(chat_id)
+        response = (
+            f"📊 Conversation Statistics:\n"
+            f"• Messages: {message_count}\n"
+            f"• Tokens: {token_count}"
+        )
+        await self._send(chat_id, response, reply_to_message_id=message_id)
+    
+    async def _send(
+        self,
+        chat_id: int,
+        text: str,
+        reply_to_message_id: Optional[int] = None,
+    ) -> None:
+        """
+        Send a message, paced by the global and per-chat rate limits;
+        each chunk of a long message takes its own token from both.
+        
+        Args:
+            chat_id: Chat ID
+            text: Message text
+            reply_to_message_id: Optional message ID to reply to
+        """
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = AsyncTokenBucket(1, CHAT_SEND_RATE)
+            self._chat_buckets[chat_id] = bucket
+        
+        async def acquire() -> None:
+            await bucket.acquire()
+            await self._global_bucket.acquire()
+        
+        try:
+            await self.api.send_message(
+                chat_id,
+                text,
+                reply_to_message_id=reply_to_message_id,
+                before_chunk=acquire,
+            )
+        except TelegramAPIError as e:
+            # Rate limited despite pacing: hold back every chat until it expires
+            if e.retry_after:
+                self._global_bucket.drain(e.retry_after)
+            raise
     
     async def process_message(self, message: TelegramMessage) -> None:
         """
@@ -313,8 +456,8 @@ class TelegramAgent:
         """
         # Check authorization
         if not self.is_authorized(message):
-            logger.warning(f"Unauthorized access attempt from chat {message.chat.id}")
-            await self.api.send_message(
+            logger.warning("Unauthorized access attempt from chat %s", message.chat.id)
+            await self._send(
                 message.chat.id,
                 "⛔ You are not authorized to use this bot.",
                 reply_to_message_id=message.message_id,
@@ -322,44 +465,55 @@ class TelegramAgent:
             return
         
         # Handle commands
-        if message.text and message.text.startswith("/"):
-            command = message.text[1:].split()[0].lower()
+        text = message.text
+        if text and text[0] == "/":
+            command = _COMMAND.match(text).group(1).lower()
             await self.handle_command(command, message.chat.id, message.message_id)
             return
         
-        # Show typing indicator
-        await self.api.send_chat_action(message.chat.id, "typing")
-        
         try:
-            # Process message based on type
-            message_content = await self.route_message(message)
-            
-            # Get agent response
-            response_text = await self.get_agent_response(
-                message.chat.id,
-                message_content,
-            )
+            # Keep the typing indicator alive while the message is processed
+            async with self.api.typing_context(message.chat.id):
+                # Process message based on type
+                message_content = await self.route_message(message)
+                
+                # Get agent response
+                response_text = await self.get_agent_response(
+                    message.chat.id,
+                    message_content,
+                )
             
             # Send response
-            await self.api.send_message(
+            await self._send(
                 message.chat.id,
                 response_text,
                 reply_to_message_id=message.message_id,
             )
             
-            # Clean up any temporary files
+            # Clean up any temporary files in the background
             if message_content.file_path:
-                await self.binary_handler.delete_file(message_content.file_path)
+                self._delete_in_background(message_content.file_path)
         
         except Exception as e:
-            logger.error(f"Error processing message: {e}", exc_info=True)
+            logger.error("Error processing message: %s", e, exc_info=True)
             error_msg = "Sorry, I encountered an error processing your message."
-            await self.api.send_message(
+            await self._send(
                 message.chat.id,
                 error_msg,
                 reply_to_message_id=message.message_id,
             )
     
+    def _delete_in_background(self, file_path: str) -> None:
+        """
+        Delete a temporary file without delaying the caller.
+        
+        Args:
+            file_path: Path to the file
+        """
+        task = asyncio.create_task(self.binary_handler.delete_file(file_path))
+        self._pending_deletes.add(task)
+        task.add_done_callback(self._pending_deletes.discard)
+    
     async def route_message(self, message: TelegramMessage) -> MessageContent:
         """
         Route message to appropriate handler.
@@ -396,20 +550,22 @@ class TelegramAgent:
         Returns:
             Agent response text
         """
+        # Prepare message for agent (can include text + BinaryContent)
+        user_message_parts = await self._prepare_agent_message(message_content)
+        
         # Get conversation history (pydantic-ai message format)
-        # This is the complete history from result.all_messages()
+        # This is the stored deque itself, passed to the agent without copying
+        # Pinned so other chats' turns can't evict it while the agent runs
+        await self.conversation_manager.load_conversation(chat_id, pin=True)
         history = self.conversation_manager.get_pydantic_history(chat_id)
         
-        # Prepare message for agent (can include text + BinaryContent)
-        user_message_parts = self._prepare_agent_message(message_content)
-        
         # Run agent with history
         try:
             # Run agent with message history
             # Important: Pass the complete message_history from previous run
             # This maintains context across the conversation
             if history:
-                logger.debug(f"Running agent with {len(history)} messages in history")
+                logger.debug("Running agent with %s messages in history", len(history))
                 result = await self.agent.run(user_message_parts, message_history=history)
             else:
                 logger.debug("Running agent without history (first message)")
@@ -417,21 +573,23 @@ class TelegramAgent:
             
             response_text = str(result.output)
             
-            # Store the complete message history from pydantic-ai
-            # This includes system prompt, all user messages, all assistant responses
-            # Use result.all_messages() to get the complete history
-            all_messages = result.all_messages()
-            self.conversation_manager.set_pydantic_history(chat_id, all_messages)
+            # Append only this run's messages to the stored history
+            # On the first run this includes the system prompt
+            new_messages = result.new_messages()
+            self.conversation_manager.extend_pydantic_history(chat_id, new_messages)
+            await self.conversation_manager.save_conversation(chat_id)
             
-            logger.debug(f"Stored {len(all_messages)} messages in history for chat {chat_id}")
+            logger.debug("Stored %s new messages in history for chat %s", len(new_messages), chat_id)
             
             return response_text
         
         except Exception as e:
-            logger.error(f"Agent error: {e}", exc_info=True)
+            logger.error("Agent error: %s", e, exc_info=True)
             raise
+        finally:
+            self.conversation_manager.unpin(chat_id)
     
-    def _prepare_agent_message(self, message_content: MessageContent) -> str | list[str | BinaryContent]:
+    async def _prepare_agent_message(self, message_content: MessageContent) -> str | list[str | BinaryContent]:
         """
         Prepare message content for the agent.
         
@@ -441,8 +599,14 @@ class TelegramAgent:
         Returns:
             Message for agent (text or list with text + BinaryContent)
         """
+        file_data = message_content.file_data
+        
+        # Images and documents are streamed to disk; read them once, off the event loop
+        if file_data is None and message_content.file_path:
+            file_data = await asyncio.to_thread(Path(message_content.file_path).read_bytes)
+        
         # If we have binary data (image, document), create BinaryContent
-        if message_content.file_data:
+        if file_data:
             parts: list[str | BinaryContent] = []
             
             # Add text if present
@@ -453,7 +617,7 @@ class TelegramAgent:
             media_type = get_media_type_from_mime(message_content.mime_type)
             
             binary_content = BinaryContent(
-                data=message_content.file_data,
+                data=file_data,
                 media_type=media_type,
             )
             parts.append(binary_content)
@@ -471,44 +635,184 @@ class TelegramAgent:
             update: Telegram update
         """
         # Get the message from the update
-        message = update.message or update.edited_message
+        message = update.effective_message
         
         if message:
             await self.process_message(message)
     
+    async def _dispatch_update(self, update: TelegramUpdate) -> None:
+        """
+        Queue an update on its chat's worker, starting one if needed.
+        Updates within a chat run in order; different chats run concurrently.
+        Waits while MAX_PENDING_UPDATES updates are already queued or running.
+        
+        Args:
+            update: Telegram update
+        """
+        message = update.effective_message
+        
+        if not message:
+            return
+        
+        await self._pending_updates.acquire()
+        
+        chat_id = message.chat.id
+        queue = self._chat_queues.get(chat_id)
+        
+        if queue is None:
+            queue = asyncio.Queue()
+            self._chat_queues[chat_id] = queue
+            self._chat_workers[chat_id] = asyncio.create_task(self._chat_worker(chat_id, queue))
+        
+        queue.put_nowait(update)
+    
+    async def _chat_worker(self, chat_id: int, queue: asyncio.Queue[TelegramUpdate]) -> None:
+        """
+        Process one chat's queued updates in order.
+        Exits once the queue is drained; the next update starts a new worker.
+        
+        Args:
+            chat_id: Chat ID
+            queue: Updates for the chat
+        """
+        # Update taken from the queue while merging, but not merged
+        held: Optional[TelegramUpdate] = None
+        
+        try:
+            while held is not None or not queue.empty():
+                update = held or queue.get_nowait()
+                update, merged, held = await self._merge_split_text(update, queue)
+                try:
+                    await self.process_update(update)
+                except Exception as e:
+                    logger.error(
+                        "Error processing update %s: %s", update.update_id, e, exc_info=True
+                    )
+                finally:
+                    for _ in range(merged):
+                        self._pending_updates.release()
+        finally:
+            # No await since the empty check, so no update can slip in here
+            self._chat_queues.pop(chat_id, None)
+            self._chat_workers.pop(chat_id, None)
+    
+    async def _merge_split_text(
+        self,
+        update: TelegramUpdate,
+        queue: asyncio.Queue[TelegramUpdate],
+    ) -> tuple[TelegramUpdate, int, Optional[TelegramUpdate]]:
+        """
+        Merge a long text message with the continuations Telegram split off it,
+        so the agent runs once on the whole text.
+        
+        Args:
+            update: Update taken from the chat's queue
+            queue: Updates for the chat
+            
+        Returns:
+            The (possibly merged) update, the number of updates it covers, and
+            an update taken from the queue that could not be merged, if any
+        """
+        message = update.message
+        if not _is_plain_text(message) or len(message.text) < SPLIT_TEXT_THRESHOLD:
+            return update, 1, None
+        
+        parts = [message.text]
+        last_update = update
+        held = None
+        
+        while len(parts[-1]) >= SPLIT_TEXT_THRESHOLD:
+            # Not wait_for: before Python 3.12 it drops an item that arrives
+            # in the same loop iteration as the timeout
+            get = asyncio.ensure_future(queue.get())
+            try:
+                await asyncio.wait({get}, timeout=SPLIT_TEXT_WINDOW)
+            finally:
+                get.cancel()
+            
+            # A get that completed as the timeout fired still holds its update
+            if not get.done() or get.cancelled():
+                break
+            next_update = get.result()
+            
+            if not _is_plain_text(next_update.message):
+                held = next_update
+                break
+            
+            parts.append(next_update.message.text)
+            last_update = next_update
+        
+        if len(parts) == 1:
+            return update, 1, held
+        
+        logger.debug("Merged %s split text messages in chat %s", len(parts), message.chat.id)
+        
+        # Reply to the last part, which is what the user saw sent last
+        merged = TelegramUpdate(
+            update_id=last_update.update_id,
+            message=last_update.message.model_copy(update={"text": "\n".join(parts)}),
+        )
+        return merged, len(parts), held
+    
     async def _polling_loop(self) -> None:
         """Main polling loop for receiving updates."""
         logger.info("Starting polling loop...")
         
+        # Consecutive failed polls, for exponential backoff
+        failures = 0
+        
         while self.running:
             try:
                 updates = await self.api.get_updates(
                     offset=self.last_update_id + 1,
-                    timeout=30,
+                    allowed_updates=ALLOWED_UPDATES,
                 )
+                failures = 0
+                
+                if not updates:
+                    continue
+                
+                # Acknowledge the whole batch up front; dispatching only queues
+                # work, so the next long poll starts right away
+                self.last_update_id = max(update.update_id for update in updates)
                 
                 for update in updates:
-                    self.last_update_id = update.update_id
-                    await self.process_update(update)
+                    await self._dispatch_update(update)
             
             except TelegramAPIError as e:
-                logger.error(f"Telegram API error: {e}")
-                await asyncio.sleep(5)
+                logger.error("Telegram API error: %s", e)
+                failures += 1
+                await asyncio.sleep(e.retry_after or _poll_backoff(failures))
             
             except Exception as e:
-                logger.error(f"Unexpected error in polling loop: {e}", exc_info=True)
-                await asyncio.sleep(5)
+                logger.error("Unexpected error in polling loop: %s", e, exc_info=True)
+                failures += 1
+                await asyncio.sleep(_poll_backoff(failures))
         
         logger.info("Polling loop stopped")
     
+    async def _warmup_transcription(self) -> None:
+        """Warm up the transcription service, logging any failure."""
+        try:
+            await self.transcription_service.warmup()
+        except Exception as e:
+            logger.error("Failed to warm up transcription service: %s", e)
+    
     async def _cleanup_loop(self) -> None:
         """Periodic cleanup of temporary files."""
         while self.running:
             try:
                 await asyncio.sleep(3600)  # Run every hour
                 await self.binary_handler.cleanup_old_files(max_age_seconds=3600)
+                
+                # Forget rate limits of idle chats
+                self._chat_buckets = {
+                    chat_id: bucket
+                    for chat_id, bucket in self._chat_buckets.items()
+                    if not bucket.full
+                }
             except Exception as e:
-                logger.error(f"Error in cleanup loop: {e}")
+                logger.error("Error in cleanup loop: %s", e)
     
     async def start(self) -> None:
         """
@@ -521,18 +825,28 @@ class TelegramAgent:
         
         self.running = True
         
-        # Get bot info
+        # Load transcription models in the background, overlapping with startup
+        if self.transcription_service:
+            self._warmup_task = asyncio.create_task(self._warmup_transcription())
+        
+        # Open the persistent HTTP connection pools
+        await self.api.startup()
+        
+        # Get bot info, warming up both connection pools
         try:
-            bot_info = await self.api.get_me()
-            logger.info(f"Bot started: @{bot_info['result']['username']}")
+            bot_info = await self.api.warmup()
+            logger.info("Bot started: @%s", bot_info['result']['username'])
         except Exception as e:
-            logger.error(f"Failed to get bot info: {e}")
+            logger.error("Failed to get bot info: %s", e)
         
         # Start cleanup task
         self._cleanup_task = asyncio.create_task(self._cleanup_loop())
         
+        # Poll in a task so stop() can cancel a pending long poll;
+        # wait() returns once it ends without raising its cancellation here
+        self._polling_task = asyncio.create_task(self._polling_loop())
         try:
-            await self._polling_loop()
+            await asyncio.wait([self._polling_task])
         finally:
             await self.stop()
     
@@ -544,30 +858,51 @@ class TelegramAgent:
         logger.info("Stopping bot...")
         self.running = False
         
-        # Cancel cleanup task
-        if self._cleanup_task:
-            self._cleanup_task.cancel()
-            try:
-                await self._cleanup_task
-            except asyncio.CancelledError:
-                pass
+        # Cancel the background loops and chat workers together
+        tasks = [
+            task
+            for task in (
+                self._polling_task,
+                self._cleanup_task,
+                self._warmup_task,
+                *self._chat_workers.values(),
+            )
+            if task is not None and task is not asyncio.current_task()
+        ]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
         
-        # Close API client
-        await self.api.close()
+        # Let pending temp file deletions finish
+        await asyncio.gather(*self._pending_deletes, return_exceptions=True)
         
-        # Close transcription service
+        # Close the API client and transcription service concurrently
+        closers = [self.api.close()]
         if self.transcription_service:
-            await self.transcription_service.close()
+            closers.append(self.transcription_service.close())
+        for result in await asyncio.gather(*closers, return_exceptions=True):
+            if isinstance(result, Exception):
+                logger.error("Error during shutdown: %s", result)
+        
+        # Close the conversation store
+        if self.conversation_manager.store:
+            await asyncio.to_thread(self.conversation_manager.store.close)
         
         logger.info("Bot stopped")
     
     def run(self) -> None:
         """
         Start the bot (synchronous version).
-        Blocks until stopped.
+        Blocks until stopped. Runs on uvloop when it is installed.
         """
         try:
-            asyncio.run(self.start())
+            import uvloop
+            runner = uvloop.run
+        except ImportError:
+            runner = asyncio.run
+        
+        try:
+            runner(self.start())
         except KeyboardInterrupt:
             logger.info("Received keyboard interrupt")
 
@@ -2,53 +2,240 @@
 Conversation history manager for tracking chat context and token usage.
 """
 
+import asyncio
 import logging
+import os
+from collections import OrderedDict, deque
 from datetime import datetime
+from functools import lru_cache
+from hashlib import blake2b
 from typing import Any, Optional
+import orjson
 import tiktoken
 
 from pydantic_ai_telegram.models import ConversationState, ConversationMessage
+from pydantic_ai_telegram.store import ConversationStore
 
 logger = logging.getLogger(__name__)
 
+# Texts counted together are encoded in parallel from this many on;
+# below it, thread startup costs more than it saves
+BATCH_ENCODE_MIN = 8
+
+# Texts this long are cached by digest instead of by value, so the
+# cache doesn't keep large tool outputs alive
+DIGEST_KEY_MIN_LENGTH = 1024
+DIGEST_CACHE_SIZE = 4096
+
+# Images/files typically count as ~85-170 tokens each; this is a rough estimate
+MEDIA_TOKEN_ESTIMATE = 100
+
+# Conversations kept in memory when backed by a store; the rest are reloaded on demand
+STORE_CACHE_SIZE = 1024
+
+
+@lru_cache(maxsize=None)
+def get_tokenizer(encoding_name: str) -> tiktoken.Encoding:
+    """Load a tiktoken encoding once per process."""
+    return tiktoken.get_encoding(encoding_name)
+
+
+@lru_cache(maxsize=4096)
+def _encode_len(encoding_name: str, text: str) -> int:
+    """Token count of a text, cached so repeated texts skip encoding."""
+    return len(get_tokenizer(encoding_name).encode(text))
+
+
+_digest_token_counts: OrderedDict[tuple[str, bytes], int] = OrderedDict()
+
+
+def _encode_len_by_digest(encoding_name: str, text: str) -> int:
+    """Token count of a long text, cached by a 16-byte digest of its content."""
+    key = (encoding_name, blake2b(text.encode(errors="surrogatepass"), digest_size=16).digest())
+    
+    tokens = _digest_token_counts.get(key)
+    if tokens is not None:
+        _digest_token_counts.move_to_end(key)
+        return tokens
+    
+    tokens = len(get_tokenizer(encoding_name).encode(text))
+    _digest_token_counts[key] = tokens
+    if len(_digest_token_counts) > DIGEST_CACHE_SIZE:
+        _digest_token_counts.popitem(last=False)
+    
+    return tokens
+
+
+def _is_system_prompt(message: Any) -> bool:
+    """Check whether a pydantic-ai message is a request starting with the system prompt."""
+    try:
+        return message.parts[0].part_kind == 'system-prompt'
+    except (AttributeError, IndexError, TypeError):
+        return False
+
 
 class ConversationManager:
     """
     Manages conversation history per chat/user with token counting.
-    Stores conversations in memory by default, easily extensible for persistence.
+    Stores conversations in memory by default. With a ConversationStore, the
+    pydantic-ai history is persisted by save_conversation() and only the most
+    recently used conversations stay in memory; async callers load with
+    load_conversation() so store I/O runs in a worker thread.
     """
     
-    def __init__(self, max_history: int = 50, encoding_name: str = "cl100k_base") -> None:
+    def __init__(
+        self,
+        max_history: int = 50,
+        encoding_name: str = "cl100k_base",
+        store: Optional[ConversationStore] = None,
+    ) -> None:
         """
         Initialize the conversation manager.
         
         Args:
             max_history: Maximum number of messages to keep per conversation
             encoding_name: Tokenizer encoding to use for token counting
+            store: Optional persistent store for conversations
         """
         self.max_history = max_history
-        self.conversations: dict[int, ConversationState] = {}
+        self.encoding_name = encoding_name
+        self.store = store
+        self.conversations: OrderedDict[int, ConversationState] = OrderedDict()
+        
+        # Chats changed since they were last written to the store
+        self._unsaved: set[int] = set()
+        
+        # Chats in the middle of an agent turn, never evicted
+        self._pinned: set[int] = set()
         
         try:
-            self.encoding = tiktoken.get_encoding(encoding_name)
+            self.encoding = get_tokenizer(encoding_name)
         except Exception as e:
-            logger.warning(f"Failed to load tiktoken encoding: {e}. Using character-based estimation.")
+            logger.warning("Failed to load tiktoken encoding: %s. Using character-based estimation.", e)
             self.encoding = None
     
     def get_or_create_conversation(self, chat_id: int) -> ConversationState:
         """
         Get existing conversation or create a new one.
         
+        A conversation that is only in the store is loaded synchronously;
+        async callers should await load_conversation() first.
+        
         Args:
             chat_id: Telegram chat ID
             
         Returns:
             ConversationState for the chat
         """
-        if chat_id not in self.conversations:
-            self.conversations[chat_id] = ConversationState(chat_id=chat_id)
+        conversation = self.conversations.get(chat_id)
+        
+        if conversation is not None:
+            if self.store:
+                self.conversations.move_to_end(chat_id)
+            return conversation
+        
+        if self.store:
+            conversation = self.store.load(chat_id)
+        if conversation is None:
+            conversation = ConversationState(chat_id=chat_id)
+        
+        self.conversations[chat_id] = conversation
         
-        return self.conversations[chat_id]
+        if self.store and len(self.conversations) > STORE_CACHE_SIZE:
+            self._evict(keep=chat_id)
+        
+        return conversation
+    
+    async def load_conversation(self, chat_id: int, pin: bool = False) -> ConversationState:
+        """
+        Get existing conversation, loading it from the store in a worker
+        thread if needed, or create a new one.
+        
+        Args:
+            chat_id: Telegram chat ID
+            pin: Keep the conversation in memory until unpin() is called, so
+                a turn spanning awaits never reloads it synchronously
+            
+        Returns:
+            ConversationState for the chat
+        """
+        if self.store and chat_id not in self.conversations:
+            conversation = await asyncio.to_thread(self.store.load, chat_id)
+            
+            # Another task may have created it while the store was read
+            if conversation is not None and chat_id not in self.conversations:
+                self.conversations[chat_id] = conversation
+                if len(self.conversations) > STORE_CACHE_SIZE:
+                    self._evict(keep=chat_id)
+        
+        conversation = self.get_or_create_conversation(chat_id)
+        if pin:
+            self._pinned.add(chat_id)
+        
+        return conversation
+    
+    def unpin(self, chat_id: int) -> None:
+        """
+        Allow a conversation pinned by load_conversation() to be evicted again.
+        
+        Args:
+            chat_id: Telegram chat ID
+        """
+        self._pinned.discard(chat_id)
+    
+    async def save_conversation(self, chat_id: int) -> None:
+        """
+        Write a changed conversation to the store in a worker thread.
+        Does nothing without a store or if nothing changed.
+        
+        Args:
+            chat_id: Telegram chat ID
+        """
+        if not self.store or chat_id not in self._unsaved:
+            return
+        
+        conversation = self.conversations.get(chat_id)
+        self._unsaved.discard(chat_id)
+        
+        try:
+            if conversation is None or not conversation._pydantic_history:
+                await asyncio.to_thread(self.store.delete, chat_id)
+                return
+            
+            # Snapshot on the event loop; the live deques may change meanwhile
+            snapshot = ConversationState(
+                chat_id=chat_id,
+                total_tokens=conversation.total_tokens,
+                created_at=conversation.created_at,
+                last_updated=conversation.last_updated,
+            )
+            snapshot._pydantic_history = deque(conversation._pydantic_history)
+            snapshot._history_tokens = deque(conversation._history_tokens)
+            
+            await asyncio.to_thread(self.store.save, snapshot)
+        except BaseException:
+            self._unsaved.add(chat_id)
+            raise
+    
+    def _evict(self, keep: int) -> None:
+        """
+        Drop the least recently used conversation that the store fully holds.
+        Messages added with add_message are never stored, and unsaved changes
+        would be lost, so conversations holding either stay in memory, as do
+        pinned ones.
+        
+        Args:
+            keep: Chat being handed to a caller, never dropped
+        """
+        for chat_id, conversation in self.conversations.items():
+            if (
+                chat_id != keep
+                and not conversation.messages
+                and chat_id not in self._unsaved
+                and chat_id not in self._pinned
+            ):
+                del self.conversations[chat_id]
+                return
     
     def get_history(self, chat_id: int) -> list[ConversationMessage]:
         """
@@ -80,9 +267,22 @@ class ConversationManager:
             message_id: Telegram message ID
             
         Returns:
-            The created ConversationMessage
+            The created ConversationMessage; it is not stored or tokenized
+            while the conversation has pydantic-ai history
         """
         conversation = self.get_or_create_conversation(chat_id)
+        now = datetime.now()
+        
+        if conversation._pydantic_history:
+            # pydantic-ai owns the history and would discard this message
+            # on its next update, so don't store or count it
+            conversation.last_updated = now
+            return ConversationMessage(
+                role=role,
+                content=content,
+                message_id=message_id,
+                timestamp=now,
+            )
         
         # Calculate tokens for this message
         tokens = self._count_tokens(content)
@@ -92,36 +292,40 @@ class ConversationManager:
             content=content,
             message_id=message_id,
             tokens=tokens,
-            timestamp=datetime.now(),
+            timestamp=now,
         )
         
         conversation.messages.append(message)
         conversation.total_tokens += tokens
-        conversation.last_updated = datetime.now()
+        conversation.last_updated = now
         
-        # Trim history if it exceeds max_history
-        if len(conversation.messages) > self.max_history:
-            removed_messages = conversation.messages[:len(conversation.messages) - self.max_history]
-            conversation.messages = conversation.messages[-self.max_history:]
-            
-            # Adjust token count
-            removed_tokens = sum(msg.tokens or 0 for msg in removed_messages)
-            conversation.total_tokens -= removed_tokens
+        # Trim history if it exceeds max_history, dropping the oldest in place
+        messages = conversation.messages
+        excess = len(messages) - self.max_history
+        if excess > 0:
+            # Adjust token count by the dropped messages only, without copying them out
+            for i in range(excess):
+                conversation.total_tokens -= messages[i].tokens or 0
+            del messages[:excess]
         
         return message
     
     def reset_conversation(self, chat_id: int) -> None:
         """
-        Clear conversation history for a chat.
+        Clear conversation history for a chat. With a store, the stored
+        copy is removed by the next save_conversation().
         
         Args:
             chat_id: Telegram chat ID
         """
-        if chat_id in self.conversations:
+        if chat_id in self.conversations or self.store:
             self.conversations[chat_id] = ConversationState(chat_id=chat_id)
-            logger.info(f"Reset conversation for chat {chat_id}")
+            logger.info("Reset conversation for chat %s", chat_id)
+        
+        if self.store:
+            self._unsaved.add(chat_id)
     
-    def get_pydantic_history(self, chat_id: int) -> Optional[list[Any]]:
+    def get_pydantic_history(self, chat_id: int) -> Optional[deque[Any]]:
         """
         Get pydantic-ai formatted message history for a chat.
         
@@ -129,86 +333,125 @@ class ConversationManager:
             chat_id: Telegram chat ID
             
         Returns:
-            List of pydantic-ai messages or None if no history
+            The stored deque of pydantic-ai messages (not a copy) or None if no history
         """
         conversation = self.get_or_create_conversation(chat_id)
-        
-        # Return the raw pydantic-ai message history if available
-        if hasattr(conversation, '_pydantic_history') and conversation._pydantic_history:
-            return conversation._pydantic_history
-        
-        return None
+        return conversation._pydantic_history or None
     
     def set_pydantic_history(self, chat_id: int, messages: list[Any]) -> None:
         """
-        Store pydantic-ai formatted message history from result.all_messages().
+        Replace the pydantic-ai formatted message history, e.g. with
+        result.all_messages().
         
         This preserves the complete conversation including system prompts,
-        user messages, assistant responses, and tool calls.
+        user messages, assistant responses, and tool calls. Messages that
+        are already stored keep their token counts; only new ones are tokenized.
+        
+        Args:
+            chat_id: Telegram chat ID
+            messages: List of pydantic-ai messages from result.all_messages()
+        """
+        conversation = self.get_or_create_conversation(chat_id)
+        
+        # Token counts of the stored messages, keyed by identity; previous
+        # keeps those messages alive so their ids stay unique until we're done
+        previous = list(conversation._pydantic_history)
+        known_tokens = dict(zip(map(id, previous), conversation._history_tokens))
+        
+        conversation._pydantic_history.clear()
+        conversation._history_tokens.clear()
+        conversation.total_tokens = 0
+        
+        self.extend_pydantic_history(chat_id, messages, known_tokens=known_tokens)
+    
+    def extend_pydantic_history(
+        self,
+        chat_id: int,
+        messages: list[Any],
+        known_tokens: Optional[dict[int, int]] = None,
+    ) -> None:
+        """
+        Append new pydantic-ai formatted messages to the history.
         
         Automatically limits history to max_history most recent messages
-        (excluding system prompt which is always kept).
+        (excluding system prompt which is always kept). Only the new
+        messages are tokenized; the oldest are dropped from the left.
+        With a store, persist the change with save_conversation().
         
         Args:
             chat_id: Telegram chat ID
-            messages: List of pydantic-ai messages from result.all_messages()
+            messages: New pydantic-ai messages from the latest agent run
+            known_tokens: Token counts already computed for some messages, keyed by id()
         """
         conversation = self.get_or_create_conversation(chat_id)
+        history = conversation._pydantic_history
+        history_tokens = conversation._history_tokens
+        
+        if conversation.messages:
+            # We don't need the old format anymore
+            conversation.messages = []
+            conversation.total_tokens = sum(history_tokens)
+        
+        for msg in messages:
+            tokens = known_tokens.get(id(msg)) if known_tokens else None
+            if tokens is None:
+                tokens = self._count_message_tokens(msg)
+            history.append(msg)
+            history_tokens.append(tokens)
+            conversation.total_tokens += tokens
         
-        # Limit history depth if needed
         # Keep system prompt (first message) and limit the rest
-        if len(messages) > self.max_history + 1:  # +1 for system prompt
-            # Check if first message is system prompt
-            system_prompt = None
-            other_messages = messages
+        pinned = 1 if history and _is_system_prompt(history[0]) else 0
+        excess = len(history) - pinned - self.max_history
+        
+        if excess > 0:
+            if pinned:
+                first, first_tokens = history.popleft(), history_tokens.popleft()
             
-            if messages and hasattr(messages[0], 'kind') and messages[0].kind == 'request':
-                # First message might be system prompt
-                if hasattr(messages[0], 'parts') and messages[0].parts:
-                    first_part = messages[0].parts[0]
-                    if hasattr(first_part, 'part_kind') and first_part.part_kind == 'system-prompt':
-                        system_prompt = messages[0]
-                        other_messages = messages[1:]
+            for _ in range(excess):
+                history.popleft()
+                conversation.total_tokens -= history_tokens.popleft()
             
-            # Keep only the most recent messages
-            if system_prompt:
-                limited_messages = [system_prompt] + other_messages[-(self.max_history):]
-            else:
-                limited_messages = other_messages[-(self.max_history):]
+            if pinned:
+                history.appendleft(first)
+                history_tokens.appendleft(first_tokens)
             
-            logger.info(f"Limited history for chat {chat_id} from {len(messages)} to {len(limited_messages)} messages")
-            messages = limited_messages
+            logger.info("Limited history for chat %s to %d messages", chat_id, len(history))
         
-        # Store the pydantic-ai message history
-        conversation._pydantic_history = messages  # type: ignore
         conversation.last_updated = datetime.now()
         
-        # Update statistics
-        conversation.total_tokens = 0
-        message_count = 0
+        if self.store:
+            self._unsaved.add(chat_id)
         
-        for msg in messages:
-            message_count += 1
-            # Estimate tokens for statistics
-            try:
-                # Try to get content from the message
-                if hasattr(msg, 'parts'):
-                    for part in msg.parts:
-                        if hasattr(part, 'content'):
-                            content = str(part.content)
-                            tokens = self._count_text_tokens(content)
-                            conversation.total_tokens += tokens
-                elif hasattr(msg, 'content'):
-                    content = str(msg.content)
-                    tokens = self._count_text_tokens(content)
-                    conversation.total_tokens += tokens
-            except Exception as e:
-                logger.debug(f"Could not estimate tokens for message: {e}")
-                pass
+        logger.debug(
+            "Updated history for chat %s: %d messages, ~%d tokens",
+            chat_id,
+            len(history),
+            conversation.total_tokens,
+        )
+    
+    def _count_message_tokens(self, message: Any) -> int:
+        """
+        Estimate tokens in a pydantic-ai message for statistics.
         
-        # Store a simple message count for display
-        conversation.messages = []  # We don't need the old format anymore
-        logger.debug(f"Updated history for chat {chat_id}: {message_count} messages, ~{conversation.total_tokens} tokens")
+        Args:
+            message: pydantic-ai message
+            
+        Returns:
+            Estimated token count
+        """
+        try:
+            # Try to get content from the message
+            if hasattr(message, 'parts'):
+                return self._count_texts_tokens([
+                    str(part.content) for part in message.parts if hasattr(part, 'content')
+                ])
+            elif hasattr(message, 'content'):
+                return self._count_text_tokens(str(message.content))
+        except Exception as e:
+            logger.debug("Could not estimate tokens for message: %s", e)
+        
+        return 0
     
     def get_token_count(self, chat_id: int) -> int:
         """
@@ -236,7 +479,7 @@ class ConversationManager:
         conversation = self.get_or_create_conversation(chat_id)
         
         # If we have pydantic history, count those messages
-        if hasattr(conversation, '_pydantic_history') and conversation._pydantic_history:
+        if conversation._pydantic_history:
             return len(conversation._pydantic_history)
         
         return len(conversation.messages)
@@ -263,21 +506,42 @@ class ConversationManager:
         if isinstance(content, str):
             return self._count_text_tokens(content)
         elif isinstance(content, list):
-            # For multimodal content, count all text parts
-            total = 0
-            for item in content:
-                if isinstance(item, str):
-                    total += self._count_text_tokens(item)
-                elif isinstance(item, dict) and "text" in item:
-                    total += self._count_text_tokens(item["text"])
-                # Images/files typically count as ~85-170 tokens each
-                # This is a rough estimate
-                elif isinstance(item, dict) and ("image" in item or "file" in item):
-                    total += 100
-            return total
+            # For multimodal content, encode all text parts together
+            # and add a flat estimate per image or file
+            texts = [item for item in content if isinstance(item, str)]
+            items = [item for item in content if isinstance(item, dict)]
+            texts.extend(item["text"] for item in items if "text" in item)
+            media = sum(
+                1 for item in items
+                if "text" not in item and ("image" in item or "file" in item)
+            )
+            return media * MEDIA_TOKEN_ESTIMATE + self._count_texts_tokens(texts)
         
         return 0
     
+    def _count_texts_tokens(self, texts: list[str]) -> int:
+        """
+        Count tokens in several texts, encoding them in parallel
+        when there are at least BATCH_ENCODE_MIN of them.
+        
+        Args:
+            texts: Texts to count tokens for
+            
+        Returns:
+            Total number of tokens
+        """
+        if self.encoding and len(texts) >= BATCH_ENCODE_MIN:
+            try:
+                encoded = self.encoding.encode_batch(
+                    texts,
+                    num_threads=min(len(texts), os.cpu_count() or 4),
+                )
+                return sum(len(tokens) for tokens in encoded)
+            except Exception as e:
+                logger.debug("Batch token counting failed: %s. Counting texts one by one.", e)
+        
+        return sum(self._count_text_tokens(text) for text in texts)
+    
     def _count_text_tokens(self, text: str) -> int:
         """
         Count tokens in text string.
@@ -288,11 +552,17 @@ class ConversationManager:
         Returns:
             Number of tokens
         """
+        # Empty captions and parts are common and never need the encoder
+        if not text:
+            return 0
+        
         if self.encoding:
             try:
-                return len(self.encoding.encode(text))
+                if len(text) >= DIGEST_KEY_MIN_LENGTH:
+                    return _encode_len_by_digest(self.encoding_name, text)
+                return _encode_len(self.encoding_name, text)
             except Exception as e:
-                logger.warning(f"Token counting failed: {e}. Using estimation.")
+                logger.warning("Token counting failed: %s. Using estimation.", e)
         
         # Fallback to character-based estimation
         # Rough estimate: ~4 characters per token on average
@@ -302,6 +572,34 @@ class ConversationManager:
         """
         Get a summary of the conversation state.
         
+        Args:
+            chat_id: Telegram chat ID
+            
+        Returns:
+            Dictionary with conversation statistics
+        """
+        summary = self._summarize(chat_id)
+        summary["created_at"] = summary["created_at"].isoformat()
+        summary["last_updated"] = summary["last_updated"].isoformat()
+        return summary
+    
+    def get_conversation_summary_json(self, chat_id: int) -> bytes:
+        """
+        Get a summary of the conversation state serialized as JSON.
+        
+        Args:
+            chat_id: Telegram chat ID
+            
+        Returns:
+            JSON-encoded conversation statistics
+        """
+        # orjson serializes datetimes natively, in the same ISO format
+        return orjson.dumps(self._summarize(chat_id))
+    
+    def _summarize(self, chat_id: int) -> dict[str, Any]:
+        """
+        Collect conversation statistics, with datetimes left as objects.
+        
         Args:
             chat_id: Telegram chat ID
             
@@ -314,8 +612,8 @@ class ConversationManager:
             "chat_id": chat_id,
             "message_count": len(conversation.messages),
             "total_tokens": conversation.total_tokens,
-            "created_at": conversation.created_at.isoformat(),
-            "last_updated": conversation.last_updated.isoformat(),
+            "created_at": conversation.created_at,
+            "last_updated": conversation.last_updated,
         }
     
     def list_active_conversations(self) -> list[int]:
@@ -325,5 +623,8 @@ class ConversationManager:
         Returns:
             List of chat IDs with active conversations
         """
+        if self.store:
+            return sorted(set(self.store.chat_ids()) | self.conversations.keys())
+        
         return list(self.conversations.keys())
 
@@ -4,7 +4,9 @@ All binaries are downloaded, processed, passed to agent, then deleted.
 """
 
 import logging
-from pathlib import Path
+import sys
+from collections import OrderedDict
+from functools import lru_cache, partial
 from typing import Optional
 
 from pydantic_ai_telegram.models import TelegramMessage, MessageContent
@@ -14,10 +16,16 @@ from pydantic_ai_telegram.transcription.base import TranscriptionService
 
 logger = logging.getLogger(__name__)
 
+# Transcriptions kept per handler, keyed by Telegram's file_unique_id,
+# so forwarded or re-sent audio skips download and transcription
+TRANSCRIPTION_CACHE_SIZE = 256
 
+
+@lru_cache(maxsize=128)
 def get_media_type_from_mime(mime_type: Optional[str]) -> str:
     """
     Convert MIME type to media type for BinaryContent.
+    Results are cached and interned, since only a handful of types recur.
     
     Args:
         mime_type: MIME type
@@ -27,7 +35,7 @@ def get_media_type_from_mime(mime_type: Optional[str]) -> str:
     """
     if not mime_type:
         return "application/octet-stream"
-    return mime_type
+    return sys.intern(mime_type)
 
 
 class MessageHandler:
@@ -52,6 +60,62 @@ class MessageHandler:
         self.api = api
         self.binary_handler = binary_handler
         self.transcription_service = transcription_service
+        self._transcriptions: OrderedDict[str, str] = OrderedDict()
+    
+    async def _transcribe_file(
+        self,
+        file_id: str,
+        file_unique_id: str,
+        extension: str,
+        prefix: str,
+    ) -> str:
+        """
+        Download and transcribe an audio file, or reuse the transcription
+        of the same file seen before.
+        
+        Args:
+            file_id: Telegram file ID to download
+            file_unique_id: Stable ID of the file, the same across resends
+            extension: Temporary file extension
+            prefix: Temporary file prefix
+            
+        Returns:
+            Transcribed text
+        """
+        cached = self._transcriptions.get(file_unique_id)
+        if cached is not None:
+            self._transcriptions.move_to_end(file_unique_id)
+            logger.debug("Reusing transcription of file %s", file_unique_id)
+            return cached
+        
+        temp_file = None
+        
+        try:
+            # Get file info
+            file_info = await self.api.get_file(file_id)
+            
+            if not file_info.file_path:
+                raise ValueError("File path not available")
+            
+            # Stream audio file to a temporary file
+            temp_file = await self.binary_handler.save_stream(
+                partial(self.api.download_file_to, file_info.file_path),
+                suffix=extension,
+                prefix=prefix,
+            )
+            
+            transcribed_text = await self.transcription_service.transcribe(temp_file)
+            
+        finally:
+            # Always clean up the temporary file
+            if temp_file:
+                await self.binary_handler.delete_file(temp_file)
+        
+        self._transcriptions[file_unique_id] = transcribed_text
+        if len(self._transcriptions) > TRANSCRIPTION_CACHE_SIZE:
+            self._transcriptions.popitem(last=False)
+        
+        return transcribed_text
 
 
 class TextHandler(MessageHandler):
@@ -102,48 +166,25 @@ class VoiceHandler(MessageHandler):
         if not self.transcription_service:
             raise ValueError("Transcription service is not configured")
         
-        temp_file: Optional[Path] = None
+        logger.info("Transcribing voice message from chat %s", message.chat.id)
         
-        try:
-            # Get file info
-            file_info = await self.api.get_file(message.voice.file_id)
-            
-            if not file_info.file_path:
-                raise ValueError("File path not available")
-            
-            # Download audio file
-            audio_data = await self.api.download_file(file_info.file_path)
-            
-            # Save to temporary file
-            extension = self.binary_handler.get_file_extension(
-                message.voice.mime_type,
-                None,
-            )
-            temp_file = await self.binary_handler.save_file(
-                audio_data,
-                suffix=extension,
-                prefix="voice_",
-            )
-            
-            logger.info(f"Transcribing voice message from chat {message.chat.id}")
-            
-            # Transcribe
-            transcribed_text = await self.transcription_service.transcribe(temp_file)
-            
-            # Add caption if present
-            full_text = transcribed_text
-            if message.caption:
-                full_text = f"{message.caption}\n\n[Voice transcription]: {transcribed_text}"
-            
-            return MessageContent(
-                text=full_text,
-                file_type="voice",
-            )
-            
-        finally:
-            # Always clean up the temporary file
-            if temp_file:
-                await self.binary_handler.delete_file(temp_file)
+        # Download and transcribe
+        transcribed_text = await self._transcribe_file(
+            message.voice.file_id,
+            message.voice.file_unique_id,
+            self.binary_handler.get_file_extension(message.voice.mime_type, None),
+            "voice_",
+        )
+        
+        # Add caption if present
+        full_text = transcribed_text
+        if message.caption:
+            full_text = f"{message.caption}\n\n[Voice transcription]: {transcribed_text}"
+        
+        return MessageContent(
+            text=full_text,
+            file_type="voice",
+        )
 
 
 class AudioHandler(MessageHandler):
@@ -171,67 +212,47 @@ class AudioHandler(MessageHandler):
         if not self.transcription_service:
             raise ValueError("Transcription service is not configured")
         
-        temp_file: Optional[Path] = None
+        logger.info("Transcribing audio file from chat %s", message.chat.id)
         
-        try:
-            # Get file info
-            file_info = await self.api.get_file(message.audio.file_id)
-            
-            if not file_info.file_path:
-                raise ValueError("File path not available")
-            
-            # Download audio file
-            audio_data = await self.api.download_file(file_info.file_path)
-            
-            # Save to temporary file
-            extension = self.binary_handler.get_file_extension(
+        # Download and transcribe
+        transcribed_text = await self._transcribe_file(
+            message.audio.file_id,
+            message.audio.file_unique_id,
+            self.binary_handler.get_file_extension(
                 message.audio.mime_type,
                 message.audio.file_name,
-            )
-            temp_file = await self.binary_handler.save_file(
-                audio_data,
-                suffix=extension,
-                prefix="audio_",
-            )
-            
-            logger.info(f"Transcribing audio file from chat {message.chat.id}")
-            
-            # Transcribe
-            transcribed_text = await self.transcription_service.transcribe(temp_file)
-            
-            # Add caption and metadata if present
-            parts = []
-            if message.caption:
-                parts.append(message.caption)
-            
-            if message.audio.title or message.audio.performer:
-                metadata = []
-                if message.audio.performer:
-                    metadata.append(f"Artist: {message.audio.performer}")
-                if message.audio.title:
-                    metadata.append(f"Title: {message.audio.title}")
-                parts.append(f"[Audio metadata]: {', '.join(metadata)}")
-            
-            parts.append(f"[Audio transcription]: {transcribed_text}")
-            
-            full_text = "\n\n".join(parts)
-            
-            return MessageContent(
-                text=full_text,
-                file_type="audio",
-                original_filename=message.audio.file_name,
-            )
-            
-        finally:
-            # Always clean up the temporary file
-            if temp_file:
-                await self.binary_handler.delete_file(temp_file)
+            ),
+            "audio_",
+        )
+        
+        # Add caption and metadata if present
+        parts = []
+        if message.caption:
+            parts.append(message.caption)
+        
+        if message.audio.title or message.audio.performer:
+            metadata = []
+            if message.audio.performer:
+                metadata.append(f"Artist: {message.audio.performer}")
+            if message.audio.title:
+                metadata.append(f"Title: {message.audio.title}")
+            parts.append(f"[Audio metadata]: {', '.join(metadata)}")
+        
+        parts.append(f"[Audio transcription]: {transcribed_text}")
+        
+        full_text = "\n\n".join(parts)
+        
+        return MessageContent(
+            text=full_text,
+            file_type="audio",
+            original_filename=message.audio.file_name,
+        )
 
 
 class PhotoHandler(MessageHandler):
     """
     Handler for photo messages.
-    Downloads photo, passes to agent as binary content, then deletes.
+    Streams photo to disk, passes to agent as binary content, then deletes.
     """
     
     async def handle(self, message: TelegramMessage) -> MessageContent:
@@ -242,7 +263,7 @@ class PhotoHandler(MessageHandler):
             message: Telegram message with photo
             
         Returns:
-            Message content with photo binary data
+            Message content with the path of the downloaded photo
         """
         if not message.photo:
             raise ValueError("Message does not contain photo")
@@ -250,46 +271,33 @@ class PhotoHandler(MessageHandler):
         # Get the largest photo size
         photo = max(message.photo, key=lambda p: p.file_size or 0)
         
-        temp_file: Optional[Path] = None
+        # Get file info
+        file_info = await self.api.get_file(photo.file_id)
         
-        try:
-            # Get file info
-            file_info = await self.api.get_file(photo.file_id)
-            
-            if not file_info.file_path:
-                raise ValueError("File path not available")
-            
-            # Download photo
-            photo_data = await self.api.download_file(file_info.file_path)
-            
-            # Save to temporary file for backup/reference
-            temp_file = await self.binary_handler.save_file(
-                photo_data,
-                suffix=".jpg",
-                prefix="photo_",
-            )
-            
-            logger.info(f"Received photo from chat {message.chat.id}")
-            
-            return MessageContent(
-                text=message.caption,
-                file_path=str(temp_file),
-                file_data=photo_data,  # Include binary data
-                file_type="image",
-                mime_type="image/jpeg",
-            )
-            
-        except Exception:
-            # Clean up on error
-            if temp_file:
-                await self.binary_handler.delete_file(temp_file)
-            raise
+        if not file_info.file_path:
+            raise ValueError("File path not available")
+        
+        # Stream photo to a temporary file; the agent reads it from there
+        temp_file = await self.binary_handler.save_stream(
+            partial(self.api.download_file_to, file_info.file_path),
+            suffix=".jpg",
+            prefix="photo_",
+        )
+        
+        logger.info("Received photo from chat %s", message.chat.id)
+        
+        return MessageContent(
+            text=message.caption,
+            file_path=str(temp_file),
+            file_type="image",
+            mime_type="image/jpeg",
+        )
 
 
 class DocumentHandler(MessageHandler):
     """
     Handler for document messages.
-    Downloads document, passes to agent as binary content, then deletes.
+    Streams document to disk, passes to agent as binary content, then deletes.
     """
     
     async def handle(self, message: TelegramMessage) -> MessageContent:
@@ -300,48 +308,35 @@ class DocumentHandler(MessageHandler):
             message: Telegram message with document
             
         Returns:
-            Message content with document binary data
+            Message content with the path of the downloaded document
         """
         if not message.document:
             raise ValueError("Message does not contain document")
         
-        temp_file: Optional[Path] = None
+        # Get file info
+        file_info = await self.api.get_file(message.document.file_id)
         
-        try:
-            # Get file info
-            file_info = await self.api.get_file(message.document.file_id)
-            
-            if not file_info.file_path:
-                raise ValueError("File path not available")
-            
-            # Download document
-            doc_data = await self.api.download_file(file_info.file_path)
-            
-            # Save to temporary file
-            extension = self.binary_handler.get_file_extension(
-                message.document.mime_type,
-                message.document.file_name,
-            )
-            temp_file = await self.binary_handler.save_file(
-                doc_data,
-                suffix=extension,
-                prefix="doc_",
-            )
-            
-            logger.info(f"Received document from chat {message.chat.id}")
-            
-            return MessageContent(
-                text=message.caption,
-                file_path=str(temp_file),
-                file_data=doc_data,  # Include binary data
-                file_type="document",
-                original_filename=message.document.file_name,
-                mime_type=message.document.mime_type,
-            )
-            
-        except Exception:
-            # Clean up on error
-            if temp_file:
-                await self.binary_handler.delete_file(temp_file)
-            raise
+        if not file_info.file_path:
+            raise ValueError("File path not available")
+        
+        # Stream document to a temporary file; the agent reads it from there
+        extension = self.binary_handler.get_file_extension(
+            message.document.mime_type,
+            message.document.file_name,
+        )
+        temp_file = await self.binary_handler.save_stream(
+            partial(self.api.download_file_to, file_info.file_path),
+            suffix=extension,
+            prefix="doc_",
+        )
+        
+        logger.info("Received document from chat %s", message.chat.id)
+        
+        return MessageContent(
+            text=message.caption,
+            file_path=str(temp_file),
+            file_type="document",
+            original_filename=message.document.file_name,
+            mime_type=message.document.mime_type,
+        )
 
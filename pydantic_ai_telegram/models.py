@@ -2,9 +2,10 @@
 Pydantic v2 models for Telegram data structures and internal state management.
 """
 
+from collections import deque
 from datetime import datetime
 from typing import Any, Optional
-from pydantic import BaseModel, Field, ConfigDict
+from pydantic import BaseModel, Field, ConfigDict, PrivateAttr, TypeAdapter
 
 
 # Telegram API Models
@@ -114,6 +115,30 @@ class TelegramUpdate(BaseModel):
     edited_message: Optional[TelegramMessage] = None
     channel_post: Optional[TelegramMessage] = None
     edited_channel_post: Optional[TelegramMessage] = None
+    
+    @property
+    def effective_message(self) -> Optional[TelegramMessage]:
+        """The new or edited message carried by this update, if any."""
+        return self.message or self.edited_message
+
+
+# Validators built once and reused for every incoming update
+UPDATE_ADAPTER = TypeAdapter(TelegramUpdate)
+UPDATES_ADAPTER = TypeAdapter(list[TelegramUpdate])
+
+
+def parse_update_json(raw: bytes | str) -> TelegramUpdate:
+    """
+    Parse a single update straight from its JSON payload (e.g. a webhook body),
+    without building an intermediate dict.
+    
+    Args:
+        raw: JSON-encoded Telegram update
+        
+    Returns:
+        Validated TelegramUpdate
+    """
+    return UPDATE_ADAPTER.validate_json(raw)
 
 
 class TelegramFile(BaseModel):
@@ -165,6 +190,10 @@ class ConversationState(BaseModel):
     total_tokens: int = 0
     created_at: datetime = Field(default_factory=datetime.now)
     last_updated: datetime = Field(default_factory=datetime.now)
+    
+    # pydantic-ai message history and the token estimate of each message
+    _pydantic_history: deque[Any] = PrivateAttr(default_factory=deque)
+    _history_tokens: deque[int] = PrivateAttr(default_factory=deque)
 
 
 class MessageContent(BaseModel):
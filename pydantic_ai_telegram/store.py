@@ -0,0 +1,181 @@
+"""
+Persistent storage for conversation state.
+Lets conversations survive restarts and keeps only recently active chats in memory.
+"""
+
+import logging
+import sqlite3
+import threading
+import zlib
+from abc import ABC, abstractmethod
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+import orjson
+from pydantic_ai.messages import ModelMessagesTypeAdapter
+
+from pydantic_ai_telegram.models import ConversationState
+
+logger = logging.getLogger(__name__)
+
+
+class ConversationStore(ABC):
+    """
+    Abstract base class for conversation storage backends.
+    Stores the pydantic-ai message history of each chat with its statistics.
+    Methods block; ConversationManager calls them from worker threads.
+    """
+    
+    @abstractmethod
+    def load(self, chat_id: int) -> Optional[ConversationState]:
+        """
+        Load a stored conversation.
+        
+        Args:
+            chat_id: Telegram chat ID
+            
+        Returns:
+            ConversationState, or None if nothing is stored for the chat
+        """
+        pass
+    
+    @abstractmethod
+    def save(self, conversation: ConversationState) -> None:
+        """
+        Store a conversation, replacing any previous version.
+        
+        Args:
+            conversation: Conversation to store
+        """
+        pass
+    
+    @abstractmethod
+    def delete(self, chat_id: int) -> None:
+        """
+        Remove a stored conversation.
+        
+        Args:
+            chat_id: Telegram chat ID
+        """
+        pass
+    
+    @abstractmethod
+    def chat_ids(self) -> list[int]:
+        """
+        Get the IDs of all stored conversations.
+        
+        Returns:
+            List of chat IDs
+        """
+        pass
+    
+    def close(self) -> None:
+        """
+        Release any resources held by the store.
+        """
+        pass
+
+
+class SqliteStore(ConversationStore):
+    """
+    Conversation store backed by a SQLite database.
+    
+    Histories are serialized with pydantic-ai's ModelMessagesTypeAdapter and
+    zlib-compressed; repeated system prompts and tool output compress well.
+    """
+    
+    def __init__(self, path: str | Path) -> None:
+        """
+        Open (or create) the database.
+        
+        Args:
+            path: Database file path
+        """
+        self.path = Path(path)
+        
+        # Used from worker threads, one at a time
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._lock = threading.Lock()
+        
+        # WAL with NORMAL sync: durable across crashes, no fsync per commit
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS conversations ("
+            "chat_id INTEGER PRIMARY KEY, "
+            "history BLOB NOT NULL, "
+            "tokens BLOB NOT NULL, "
+            "total_tokens INTEGER NOT NULL, "
+            "created_at REAL NOT NULL, "
+            "last_updated REAL NOT NULL)"
+        )
+        self._db.commit()
+    
+    def load(self, chat_id: int) -> Optional[ConversationState]:
+        """Load a stored conversation."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT history, tokens, total_tokens, created_at, last_updated "
+                "FROM conversations WHERE chat_id = ?",
+                (chat_id,),
+            ).fetchone()
+        
+        if row is None:
+            return None
+        
+        history, tokens, total_tokens, created_at, last_updated = row
+        
+        try:
+            messages = ModelMessagesTypeAdapter.validate_json(zlib.decompress(history))
+        except Exception as e:
+            logger.warning("Discarding unreadable history for chat %s: %s", chat_id, e)
+            return None
+        
+        conversation = ConversationState(
+            chat_id=chat_id,
+            total_tokens=total_tokens,
+            created_at=datetime.fromtimestamp(created_at),
+            last_updated=datetime.fromtimestamp(last_updated),
+        )
+        conversation._pydantic_history = deque(messages)
+        conversation._history_tokens = deque(orjson.loads(tokens))
+        
+        return conversation
+    
+    def save(self, conversation: ConversationState) -> None:
+        """Store a conversation, replacing any previous version."""
+        history = zlib.compress(
+            ModelMessagesTypeAdapter.dump_json(list(conversation._pydantic_history))
+        )
+        
+        tokens = orjson.dumps(list(conversation._history_tokens))
+        
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO conversations VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    conversation.chat_id,
+                    history,
+                    tokens,
+                    conversation.total_tokens,
+                    conversation.created_at.timestamp(),
+                    conversation.last_updated.timestamp(),
+                ),
+            )
+    
+    def delete(self, chat_id: int) -> None:
+        """Remove a stored conversation."""
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM conversations WHERE chat_id = ?", (chat_id,))
+    
+    def chat_ids(self) -> list[int]:
+        """Get the IDs of all stored conversations."""
+        with self._lock:
+            return [row[0] for row in self._db.execute("SELECT chat_id FROM conversations")]
+    
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._db.close()
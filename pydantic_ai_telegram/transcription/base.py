@@ -2,8 +2,10 @@
 Abstract base class for transcription services.
 """
 
+import asyncio
 from abc import ABC, abstractmethod
 from pathlib import Path
+from typing import Any
 
 
 class TranscriptionService(ABC):
@@ -28,6 +30,40 @@ class TranscriptionService(ABC):
         """
         pass
     
+    async def __aenter__(self) -> "TranscriptionService":
+        """Async context manager entry."""
+        return self
+    
+    async def __aexit__(self, exc_type: Any, exc_val: Any, exc_tb: Any) -> None:
+        """Async context manager exit; releases the service's resources."""
+        await self.close()
+    
+    async def transcribe_many(
+        self,
+        audio_file_paths: list[str | Path],
+    ) -> list[str | BaseException]:
+        """
+        Transcribe several audio files concurrently.
+        Services bound their own concurrency, so all files are started at once.
+        
+        Args:
+            audio_file_paths: Paths to the audio files
+            
+        Returns:
+            Transcribed text for each file, in order, or the exception it raised
+        """
+        return await asyncio.gather(
+            *(self.transcribe(path) for path in audio_file_paths),
+            return_exceptions=True,
+        )
+    
+    async def warmup(self) -> None:
+        """
+        Prepare the service ahead of the first request (e.g. load models).
+        Does nothing by default.
+        """
+        pass
+    
     @abstractmethod
     async def close(self) -> None:
         """
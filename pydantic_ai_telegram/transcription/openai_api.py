@@ -2,14 +2,23 @@
 OpenAI API transcription service using Whisper API.
 """
 
+import asyncio
 import logging
 from pathlib import Path
 from typing import Any, Optional
 
+import httpx
+
 from pydantic_ai_telegram.transcription.base import TranscriptionService
 
 logger = logging.getLogger(__name__)
 
+# Uploads of long recordings can take minutes on slow links
+DEFAULT_READ_TIMEOUT = 600.0
+
+# Uploads in flight at once; the rest wait instead of piling onto the connection pool
+MAX_CONCURRENT_UPLOADS = 16
+
 
 class OpenAITranscription(TranscriptionService):
     """
@@ -22,6 +31,11 @@ class OpenAITranscription(TranscriptionService):
         api_key: str,
         model: str = "whisper-1",
         language: Optional[str] = None,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 50,
+        read_timeout: float = DEFAULT_READ_TIMEOUT,
+        max_concurrent: int = MAX_CONCURRENT_UPLOADS,
+        http_client: Optional[httpx.AsyncClient] = None,
     ) -> None:
         """
         Initialize OpenAI transcription service.
@@ -30,11 +44,24 @@ class OpenAITranscription(TranscriptionService):
             api_key: OpenAI API key
             model: Model to use (whisper-1)
             language: Language code for transcription (None for auto-detection)
+            max_connections: Maximum concurrent connections to the API
+            max_keepalive_connections: Idle connections kept open for reuse
+            read_timeout: Seconds to wait on reading or writing an upload
+            max_concurrent: Maximum transcription requests in flight at once
+            http_client: HTTP client shared with other services or instances,
+                used instead of a private pool and left open by close(); the
+                connection options above then don't apply
         """
         self.api_key = api_key
         self.model = model
         self.language = language
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.read_timeout = read_timeout
         self.client: Optional[Any] = None
+        self._http: Optional[httpx.AsyncClient] = http_client
+        self._owns_http = http_client is None
+        self._upload_semaphore = asyncio.Semaphore(max_concurrent)
         
         try:
             from openai import AsyncOpenAI
@@ -47,8 +74,24 @@ class OpenAITranscription(TranscriptionService):
     
     def _get_client(self) -> Any:
         """Get or create OpenAI client (lazy loading)."""
+        if self.client is None and self._http is None:
+            # One pooled HTTP/2 client for all uploads, so connections and
+            # TLS sessions are reused; requests wait for a free connection
+            # instead of timing out during bursts
+            self._http = httpx.AsyncClient(
+                http2=True,
+                timeout=httpx.Timeout(
+                    self.read_timeout,
+                    connect=10.0,
+                    pool=None,
+                ),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive_connections,
+                ),
+            )
         if self.client is None:
-            self.client = self.AsyncOpenAI(api_key=self.api_key)
+            self.client = self.AsyncOpenAI(api_key=self.api_key, http_client=self._http)
         return self.client
     
     async def transcribe(self, audio_file_path: str | Path) -> str:
@@ -64,21 +107,27 @@ class OpenAITranscription(TranscriptionService):
         Raises:
             Exception: If transcription fails
         """
-        audio_path = Path(audio_file_path)
+        audio_path = audio_file_path if isinstance(audio_file_path, Path) else Path(audio_file_path)
         
-        if not audio_path.exists():
+        # Stat off the event loop; temp storage may be a slow volume
+        if not await asyncio.to_thread(audio_path.is_file):
             raise FileNotFoundError(f"Audio file not found: {audio_path}")
         
         client = self._get_client()
         
         logger.info(f"Transcribing audio file with OpenAI: {audio_path}")
         
-        # Open file and send to OpenAI
-        with open(audio_path, "rb") as audio_file:
-            kwargs = {"file": audio_file, "model": self.model}
-            
-            if self.language:
-                kwargs["language"] = self.language
+        kwargs: dict[str, Any] = {"model": self.model}
+        
+        if self.language:
+            kwargs["language"] = self.language
+        
+        # Only files about to be uploaded are held in memory
+        async with self._upload_semaphore:
+            # Read the file off the event loop; the SDK takes (filename, bytes)
+            # and detects the format from the name
+            audio_data = await asyncio.to_thread(audio_path.read_bytes)
+            kwargs["file"] = (audio_path.name, audio_data)
             
             transcript = await client.audio.transcriptions.create(**kwargs)
         
@@ -87,9 +136,17 @@ class OpenAITranscription(TranscriptionService):
         return transcript.text.strip()
     
     async def close(self) -> None:
-        """Clean up resources (close HTTP client)."""
+        """Clean up resources (close HTTP client, unless it is shared)."""
+        if not self._owns_http:
+            # The OpenAI client would close the shared HTTP client with it
+            self.client = None
+            return
+        
         if self.client is not None:
             await self.client.close()
             self.client = None
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
             logger.info("OpenAI client closed")
 
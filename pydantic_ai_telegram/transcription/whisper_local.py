@@ -1,23 +1,58 @@
 """
-Local Whisper transcription service using openai-whisper.
+Local Whisper transcription service using openai-whisper or faster-whisper.
 
 Based on: https://github.com/openai/whisper
+and https://github.com/SYSTRAN/faster-whisper
 """
 
 import asyncio
 import logging
+import os
 import shutil
+import subprocess
+import threading
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
+from types import MappingProxyType
 from typing import Any, Optional
 
 from pydantic_ai_telegram.transcription.base import TranscriptionService
 
 logger = logging.getLogger(__name__)
 
+# Transcriptions run at once on a faster-whisper model; more just contend for
+# CPU/GPU. openai-whisper always runs one at a time: its decoder installs
+# kv-cache hooks on the shared model per call, so concurrent calls corrupt
+# each other's caches
+MAX_CONCURRENT_TRANSCRIPTIONS = 2
 
+BACKENDS = ("openai-whisper", "faster-whisper")
+
+# Model sizes, from fastest to most accurate
+_MODEL_INFO = MappingProxyType({
+    "tiny": MappingProxyType({"params": "39M", "ram": "~1GB", "speed": "~10x"}),
+    "base": MappingProxyType({"params": "74M", "ram": "~1GB", "speed": "~7x"}),
+    "small": MappingProxyType({"params": "244M", "ram": "~2GB", "speed": "~4x"}),
+    "medium": MappingProxyType({"params": "769M", "ram": "~5GB", "speed": "~2x"}),
+    "large": MappingProxyType({"params": "1550M", "ram": "~10GB", "speed": "1x"}),
+    "turbo": MappingProxyType({"params": "809M", "ram": "~6GB", "speed": "~8x"}),
+})
+
+# Whisper models take 16 kHz mono audio
+WHISPER_SAMPLE_RATE = 16000
+
+# Voice notes and audio files hold a single audio stream, found within the
+# first few kilobytes; ffmpeg's defaults probe up to 5 MB and 5 seconds first
+FFMPEG_PROBE_SIZE = 64 * 1024
+
+
+@lru_cache(maxsize=1)
 def check_ffmpeg_installed() -> bool:
     """
     Check if ffmpeg is installed on the system.
+    Checked once per process, since it walks every PATH entry.
     
     Returns:
         True if ffmpeg is available, False otherwise
@@ -25,6 +60,7 @@ def check_ffmpeg_installed() -> bool:
     return shutil.which("ffmpeg") is not None
 
 
+@lru_cache(maxsize=1)
 def get_ffmpeg_install_instructions() -> str:
     """
     Get platform-specific ffmpeg installation instructions.
@@ -66,6 +102,12 @@ class LocalWhisperTranscription(TranscriptionService):
     - openai-whisper package: pip install openai-whisper
     - ffmpeg installed on system
     
+    Or, with backend="faster-whisper":
+    - faster-whisper package: pip install faster-whisper
+    
+    faster-whisper runs the same models on CTranslate2 with int8 weights,
+    several times faster and in less memory, and decodes audio without ffmpeg.
+    
     Available models (from fastest to most accurate):
     - tiny: 39M params, ~1GB RAM, ~10x speed
     - base: 74M params, ~1GB RAM, ~7x speed
@@ -83,6 +125,11 @@ class LocalWhisperTranscription(TranscriptionService):
         device: Optional[str] = None,
         language: Optional[str] = None,
         verbose: bool = False,
+        backend: str = "openai-whisper",
+        compute_type: Optional[str] = None,
+        batch_size: int = 1,
+        silence_threshold: float = 0.0,
+        concurrent_workers: int = MAX_CONCURRENT_TRANSCRIPTIONS,
     ) -> None:
         """
         Initialize local Whisper transcription service.
@@ -106,30 +153,68 @@ class LocalWhisperTranscription(TranscriptionService):
                 - "es": Spanish
                 - etc. (see Whisper docs for full list)
             verbose: Show detailed transcription progress
-            
+            backend: Inference library
+                - "openai-whisper": Reference PyTorch implementation
+                - "faster-whisper": CTranslate2 implementation, quantized
+            compute_type: faster-whisper weight type (default: "int8",
+                or "int8_float16" on CUDA)
+            batch_size: faster-whisper only; above 1, the segments of each file
+                are decoded in batches of this size (mostly useful on GPU)
+            silence_threshold: openai-whisper only; audio whose RMS level is below
+                this is returned as empty text without running the model
+                (default 0: disabled; around 0.005 skips near-silent notes,
+                but may also skip very quiet speech)
+            concurrent_workers: faster-whisper only; transcriptions run at once,
+                each on its own model worker so they overlap on the device
+                (openai-whisper always transcribes one file at a time)
+                
         Raises:
-            ImportError: If openai-whisper is not installed
-            RuntimeError: If ffmpeg is not installed
+            ValueError: If the backend is unknown
+            ImportError: If the backend's package is not installed
+            RuntimeError: If ffmpeg is not installed (openai-whisper only)
         """
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown Whisper backend {backend!r}; expected one of {BACKENDS}")
+        
         self.model_name = model_name
         self.device = device
         self.language = language
         self.verbose = verbose
+        self.backend = backend
+        self.compute_type = compute_type or ("int8_float16" if device == "cuda" else "int8")
+        self.batch_size = batch_size
+        self.silence_threshold = silence_threshold
         self.model: Optional[Any] = None
+        self._model_lock = threading.Lock()  # Warmup and transcribe may load concurrently
+        self.concurrent_workers = concurrent_workers if backend == "faster-whisper" else 1
+        self._transcribe_semaphore = asyncio.Semaphore(self.concurrent_workers)
+        self._executor: Optional[ThreadPoolExecutor] = None
         
-        # Check for openai-whisper
-        try:
-            import whisper
-            self.whisper = whisper
-        except ImportError:
-            raise ImportError(
-                "openai-whisper is not installed.\n"
-                "Install it with: pip install openai-whisper\n"
-                "Or: pip install pydantic-ai-telegram[whisper]"
-            )
+        if backend == "faster-whisper":
+            # Check for faster-whisper
+            try:
+                import faster_whisper
+                self.whisper = faster_whisper
+            except ImportError:
+                raise ImportError(
+                    "faster-whisper is not installed.\n"
+                    "Install it with: pip install faster-whisper\n"
+                    "Or: pip install pydantic-ai-telegram[faster-whisper]"
+                )
+        else:
+            # Check for openai-whisper
+            try:
+                import whisper
+                self.whisper = whisper
+            except ImportError:
+                raise ImportError(
+                    "openai-whisper is not installed.\n"
+                    "Install it with: pip install openai-whisper\n"
+                    "Or: pip install pydantic-ai-telegram[whisper]"
+                )
         
-        # Check for ffmpeg
-        if not check_ffmpeg_installed():
+        # Check for ffmpeg (faster-whisper decodes audio itself)
+        if backend == "openai-whisper" and not check_ffmpeg_installed():
             instructions = get_ffmpeg_install_instructions()
             raise RuntimeError(
                 f"ffmpeg is not installed on your system.\n"
@@ -137,27 +222,44 @@ class LocalWhisperTranscription(TranscriptionService):
                 f"ffmpeg is required for audio processing with Whisper."
             )
         
-        logger.info(f"Initialized LocalWhisperTranscription with model={model_name}, language={language or 'auto-detect'}")
+        logger.info(f"Initialized LocalWhisperTranscription with model={model_name}, backend={backend}, language={language or 'auto-detect'}")
     
     def _load_model(self) -> Any:
         """
         Load the Whisper model (lazy loading).
+        Blocking; call from a worker thread.
         
         Returns:
             Loaded Whisper model
         """
+        with self._model_lock:
+            return self._load_model_locked()
+    
+    def _load_model_locked(self) -> Any:
+        """Load the Whisper model; the caller holds _model_lock."""
         if self.model is None:
             logger.info(f"Loading Whisper model '{self.model_name}'...")
             logger.info("First time may take a while to download the model")
             
             try:
-                self.model = self.whisper.load_model(self.model_name, device=self.device)
+                if self.backend == "faster-whisper":
+                    self.model = self.whisper.WhisperModel(
+                        self.model_name,
+                        device=self.device or "auto",
+                        compute_type=self.compute_type,
+                        num_workers=self.concurrent_workers,
+                    )
+                    if self.batch_size > 1:
+                        # Same transcribe() interface, decoding segments in batches
+                        self.model = self.whisper.BatchedInferencePipeline(model=self.model)
+                else:
+                    self.model = self.whisper.load_model(self.model_name, device=self.device)
                 logger.info(f"✓ Whisper model '{self.model_name}' loaded successfully")
                 
                 # Log device info
                 if hasattr(self.model, 'device'):
                     logger.info(f"  Running on: {self.model.device}")
-                
+            
             except Exception as e:
                 logger.error(f"Failed to load Whisper model: {e}")
                 raise
@@ -183,28 +285,40 @@ class LocalWhisperTranscription(TranscriptionService):
             FileNotFoundError: If audio file doesn't exist
             Exception: If transcription fails
         """
-        audio_path = Path(audio_file_path)
+        # Whisper and ffmpeg take a plain path string
+        audio_path = os.fspath(audio_file_path)
         
-        if not audio_path.exists():
+        # Stat off the event loop; temp storage may be a slow volume
+        if not await asyncio.to_thread(os.path.isfile, audio_path):
             raise FileNotFoundError(f"Audio file not found: {audio_path}")
         
-        # Load model if not already loaded
-        model = self._load_model()
+        # Load model if not already loaded, off the event loop
+        model = self.model
+        if model is None:
+            model = await asyncio.to_thread(self._load_model)
         
-        # Run transcription in thread pool to avoid blocking
-        loop = asyncio.get_event_loop()
-        result = await loop.run_in_executor(
-            None,
-            self._transcribe_sync,
-            model,
-            str(audio_path),
-        )
+        # Run transcription in our own threads so inference never occupies
+        # the default pool other blocking calls (file I/O, model loading) use;
+        # the semaphore keeps waiting requests out of the executor queue
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.concurrent_workers,
+                thread_name_prefix="whisper",
+            )
+        loop = asyncio.get_running_loop()
+        async with self._transcribe_semaphore:
+            result = await loop.run_in_executor(
+                self._executor,
+                self._transcribe_sync,
+                model,
+                audio_path,
+            )
         
         return result["text"].strip()
     
     def _transcribe_sync(self, model: Any, audio_path: str) -> dict:
         """
-        Synchronous transcription (runs in thread pool).
+        Synchronous transcription (runs in the Whisper executor).
         
         Args:
             model: Loaded Whisper model
@@ -219,6 +333,9 @@ class LocalWhisperTranscription(TranscriptionService):
         # Build transcription options
         options: dict[str, Any] = {
             "verbose": self.verbose,
+            # Half precision on GPU, where the model was placed (by device
+            # or autodetected); on CPU Whisper would warn and use FP32 anyway
+            "fp16": getattr(getattr(model, "device", None), "type", None) == "cuda",
         }
         
         # Add language if specified
@@ -230,7 +347,17 @@ class LocalWhisperTranscription(TranscriptionService):
         
         try:
             # Transcribe using Whisper
-            result = model.transcribe(audio_path, **options)
+            if self.backend == "faster-whisper":
+                result = self._transcribe_faster_whisper(model, audio_path)
+            else:
+                audio = self._load_audio(audio_path)
+                
+                # Whisper tends to hallucinate text for silence, at full cost
+                if self._is_silent(audio):
+                    logger.info("  Audio is silent, skipping transcription")
+                    return {"text": "", "segments": [], "language": self.language or "auto-detect"}
+                
+                result = model.transcribe(audio, **options)
             
             # Log detected language if auto-detect was used
             if not self.language and "language" in result:
@@ -240,11 +367,112 @@ class LocalWhisperTranscription(TranscriptionService):
             logger.info(f"  Transcription completed ({len(result['text'])} characters)")
             
             return result
-            
+        
         except Exception as e:
             logger.error(f"Transcription failed: {e}")
             raise
     
+    def _load_audio(self, audio_path: str) -> Any:
+        """
+        Decode audio to 16 kHz mono samples in one ffmpeg pipe, with a short probe.
+        WAV files already in that format are read directly, without ffmpeg.
+        
+        Args:
+            audio_path: Path to audio file
+            
+        Returns:
+            float32 numpy array of samples, or the path itself if the short
+            probe couldn't decode the file (Whisper then decodes it)
+        """
+        import numpy as np
+        
+        try:
+            with wave.open(audio_path, "rb") as wav:
+                if (
+                    wav.getframerate() == WHISPER_SAMPLE_RATE
+                    and wav.getnchannels() == 1
+                    and wav.getsampwidth() == 2
+                ):
+                    pcm = wav.readframes(wav.getnframes())
+                    return np.frombuffer(pcm, np.int16).astype(np.float32) / 32768.0
+        except (wave.Error, EOFError):
+            pass  # Not a PCM WAV file
+        
+        cmd = [
+            "ffmpeg",
+            "-nostdin",
+            "-threads", "0",
+            "-probesize", str(FFMPEG_PROBE_SIZE),
+            "-analyzeduration", "0",
+            "-i", audio_path,
+            "-f", "s16le",
+            "-ac", "1",
+            "-acodec", "pcm_s16le",
+            "-ar", str(WHISPER_SAMPLE_RATE),
+            "-",
+        ]
+        
+        try:
+            out = subprocess.run(cmd, capture_output=True, check=True).stdout
+        except subprocess.CalledProcessError as e:
+            logger.debug(
+                "Fast audio decode failed, using Whisper's: %s", e.stderr.decode(errors="replace")
+            )
+            return audio_path
+        
+        return np.frombuffer(out, np.int16).astype(np.float32) / 32768.0
+    
+    def _is_silent(self, audio: Any) -> bool:
+        """
+        Check whether decoded audio is silent, from the RMS level of every 16th sample.
+        
+        Args:
+            audio: float32 numpy array of samples, or a path (never silent)
+            
+        Returns:
+            True if the audio is empty or below silence_threshold
+        """
+        if isinstance(audio, str) or self.silence_threshold <= 0:
+            return False
+        
+        import numpy as np
+        
+        sample = audio[::16]
+        return sample.size == 0 or float(np.sqrt(np.mean(sample ** 2))) < self.silence_threshold
+    
+    def _transcribe_faster_whisper(self, model: Any, audio_path: str) -> dict:
+        """
+        Transcribe with faster-whisper, returning openai-whisper's result shape.
+        
+        Args:
+            model: Loaded faster-whisper model or batched pipeline
+            audio_path: Path to audio file
+            
+        Returns:
+            Transcription result dictionary (text, segments, language)
+        """
+        options: dict[str, Any] = {"language": self.language}
+        if self.batch_size > 1:
+            options["batch_size"] = self.batch_size
+        
+        segments, info = model.transcribe(audio_path, **options)
+        
+        # Segments are decoded lazily, as the generator is consumed
+        segments = list(segments)
+        
+        return {
+            "text": "".join(segment.text for segment in segments),
+            "segments": segments,
+            "language": info.language,
+        }
+    
+    async def warmup(self) -> None:
+        """
+        Load the Whisper model in a worker thread so the first voice
+        message doesn't wait for it.
+        """
+        await asyncio.to_thread(self._load_model)
+    
     async def close(self) -> None:
         """
         Clean up resources (unload model).
@@ -252,6 +480,10 @@ class LocalWhisperTranscription(TranscriptionService):
         Whisper models don't have explicit cleanup methods,
         but we clear the reference to allow garbage collection.
         """
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        
         if self.model is not None:
             self.model = None
             logger.info("Whisper model unloaded")
@@ -263,7 +495,7 @@ class LocalWhisperTranscription(TranscriptionService):
         Returns:
             List of model names
         """
-        return ["tiny", "base", "small", "medium", "large", "turbo"]
+        return list(_MODEL_INFO)
     
     def get_model_info(self) -> dict[str, Any]:
         """
@@ -272,20 +504,12 @@ class LocalWhisperTranscription(TranscriptionService):
         Returns:
             Dictionary with model information
         """
-        model_info = {
-            "tiny": {"params": "39M", "ram": "~1GB", "speed": "~10x"},
-            "base": {"params": "74M", "ram": "~1GB", "speed": "~7x"},
-            "small": {"params": "244M", "ram": "~2GB", "speed": "~4x"},
-            "medium": {"params": "769M", "ram": "~5GB", "speed": "~2x"},
-            "large": {"params": "1550M", "ram": "~10GB", "speed": "1x"},
-            "turbo": {"params": "809M", "ram": "~6GB", "speed": "~8x"},
-        }
-        
         return {
             "model": self.model_name,
+            "backend": self.backend,
             "language": self.language or "auto-detect",
             "device": self.device or "auto",
-            "info": model_info.get(self.model_name, {}),
+            "info": dict(_MODEL_INFO.get(self.model_name, {})),
             "ffmpeg_available": check_ffmpeg_installed(),
         }
 
@@ -0,0 +1,13 @@
+"""
+Shared test fixtures.
+"""
+
+import pytest
+
+from pydantic_ai_telegram.binary_handler import BinaryHandler
+
+
+@pytest.fixture
+def binary_handler(tmp_path):
+    """Create a BinaryHandler writing into a per-test temporary directory."""
+    return BinaryHandler(temp_dir=str(tmp_path))
@@ -2,11 +2,13 @@
 Tests for TelegramAPI.
 """
 
+import asyncio
 import pytest
-from unittest.mock import Mock, AsyncMock, patch
+from unittest.mock import AsyncMock, patch
 import httpx
+import respx
 
-from pydantic_ai_telegram.api import TelegramAPI, TelegramAPIError
+from pydantic_ai_telegram.api import AsyncTokenBucket, TelegramAPI, TelegramAPIError
 
 
 @pytest.fixture
@@ -29,63 +31,350 @@ def test_api_init_custom_timeout():
 
 
 @pytest.mark.asyncio
-async def test_ensure_client(api):
+async def test_startup(api):
     """Test client initialization."""
-    client = await api._ensure_client()
+    await api.startup()
+    client = api._get_client()
     assert client is not None
-    assert api.client is client
+    assert api._get_client(poll=True) is not client
+    
+    # Calling startup again keeps the same pool
+    await api.startup()
+    assert api._get_client() is client
     await api.close()
 
 
+def test_get_client_not_started(api):
+    """Test using the API before startup."""
+    with pytest.raises(RuntimeError):
+        api._get_client()
+
+
 @pytest.mark.asyncio
 async def test_close(api):
-    """Test closing the API client."""
-    await api._ensure_client()
-    assert api.client is not None
+    """Test closing the API clients."""
+    await api.startup()
+    assert api._api_client is not None
+    assert api._poll_client is not None
     
     await api.close()
-    assert api.client is None
+    assert api._api_client is None
+    assert api._poll_client is None
 
 
 @pytest.mark.asyncio
+@respx.mock
 async def test_request_success(api):
     """Test successful API request."""
-    mock_response = Mock()
-    mock_response.json.return_value = {"ok": True, "result": {"id": 123}}
-    mock_response.raise_for_status = Mock()
-    
-    with patch.object(api, '_ensure_client') as mock_client:
-        mock_http = AsyncMock()
-        mock_http.post = AsyncMock(return_value=mock_response)
-        mock_client.return_value = mock_http
-        
-        result = await api._request("getMe")
-        
-        assert result["ok"] is True
-        assert result["result"]["id"] == 123
+    route = respx.post("https://api.telegram.org/bottest_token/getMe").respond(
+        json={"ok": True, "result": {"id": 123}}
+    )
+    await api.startup()
+    
+    result = await api._request("getMe")
+    
+    assert result["ok"] is True
+    assert result["result"]["id"] == 123
+    assert route.call_count == 1
+    await api.close()
 
 
 @pytest.mark.asyncio
+@respx.mock
 async def test_request_api_error(api):
     """Test API error handling."""
-    mock_response = Mock()
-    mock_response.json.return_value = {
+    respx.post("https://api.telegram.org/bottest_token/getMe").respond(json={
         "ok": False,
         "error_code": 401,
         "description": "Unauthorized"
+    })
+    await api.startup()
+    
+    with pytest.raises(TelegramAPIError) as exc_info:
+        await api._request("getMe")
+    
+    assert exc_info.value.error_code == 401
+    assert "Unauthorized" in str(exc_info.value)
+    await api.close()
+
+
+def test_split_message_short(api):
+    """Test that short messages are not split."""
+    assert api._split_message("Hello") == ["Hello"]
+
+
+def test_split_message_prefers_natural_boundaries(api):
+    """Test splitting at paragraphs, then lines, then spaces."""
+    text = "a" * 30 + "\n\n" + "b" * 10 + "\n" + "c" * 5 + " " + "d" * 20
+    
+    assert api._split_message(text, max_length=50) == [
+        "a" * 30,
+        "b" * 10 + "\n" + "c" * 5 + " " + "d" * 20,
+    ]
+    assert api._split_message("a" * 30 + " " + "b" * 30, max_length=40) == ["a" * 30, "b" * 30]
+    assert api._split_message("x" * 100, max_length=40) == ["x" * 40, "x" * 40, "x" * 20]
+
+
+def test_split_message_counts_utf16_units(api):
+    """Test that emoji count as two UTF-16 code units towards the limit."""
+    text = "\U0001F600" * 30
+    
+    chunks = api._split_message(text, max_length=40)
+    
+    assert "".join(chunks) == text
+    assert [len(chunk.encode("utf-16-le")) // 2 for chunk in chunks] == [40, 20]
+
+
+@pytest.mark.asyncio
+async def test_send_message_chunks_not_interleaved(api):
+    """Test concurrent long replies to one chat keep their chunks together."""
+    sent: list[str] = []
+    
+    async def fake_request(method, data=None, **kwargs):
+        await asyncio.sleep(0)
+        sent.append(data["text"][0])
+        return {"ok": True, "result": {}}
+    
+    with patch.object(api, '_request', side_effect=fake_request):
+        await asyncio.gather(
+            api.send_message(1, "a" * 5000),
+            api.send_message(1, "b" * 5000),
+        )
+    
+    assert sent == ["a", "a", "b", "b"]
+
+
+@pytest.mark.asyncio
+async def test_send_message_paces_each_chunk(api):
+    """Test that before_chunk is awaited once per chunk, before it is sent."""
+    events: list[str] = []
+    
+    async def fake_request(method, data=None, **kwargs):
+        events.append("send")
+        return {"ok": True, "result": {}}
+    
+    async def before_chunk():
+        events.append("acquire")
+    
+    with patch.object(api, '_request', side_effect=fake_request):
+        await api.send_message(1, "a" * 5000, before_chunk=before_chunk)
+    
+    assert events == ["acquire", "send", "acquire", "send"]
+
+
+@pytest.mark.asyncio
+async def test_get_updates_allowed_updates(api):
+    """Test that allowed_updates and the long-poll timeout are sent."""
+    mock_request = AsyncMock(return_value={"ok": True, "result": []})
+    
+    with patch.object(api, '_request', mock_request):
+        await api.get_updates(offset=5, allowed_updates=["message"])
+    
+    data = mock_request.call_args.kwargs["data"]
+    assert data["allowed_updates"] == ["message"]
+    assert data["offset"] == 5
+    assert data["timeout"] == 50
+    assert mock_request.call_args.kwargs["timeout"] == 55
+
+
+@pytest.mark.asyncio
+async def test_get_updates_skips_invalid_update(api):
+    """Test that one malformed update doesn't drop the whole batch."""
+    result = {
+        "ok": True,
+        "result": [
+            {
+                "update_id": 1,
+                "message": {"message_id": 1, "date": 0, "chat": {"id": 1, "type": "private"}},
+            },
+            {"update_id": "not-a-number"},
+            {"update_id": 3},
+        ],
     }
-    mock_response.raise_for_status = Mock()
     
-    with patch.object(api, '_ensure_client') as mock_client:
-        mock_http = AsyncMock()
-        mock_http.post = AsyncMock(return_value=mock_response)
-        mock_client.return_value = mock_http
+    with patch.object(api, '_request', AsyncMock(return_value=result)):
+        updates = await api.get_updates()
+    
+    assert [u.update_id for u in updates] == [1, 3]
+
+
+@pytest.mark.asyncio
+async def test_get_file_cached(api):
+    """Test that getFile results are reused for the same file_id."""
+    result = {"ok": True, "result": {"file_id": "abc", "file_unique_id": "u", "file_path": "a.jpg"}}
+    mock_request = AsyncMock(return_value=result)
+    
+    with patch.object(api, '_request', mock_request):
+        first = await api.get_file("abc")
+        second = await api.get_file("abc")
+    
+    assert first.file_path == "a.jpg"
+    assert second is first
+    assert mock_request.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_request_retries_after_rate_limit(api):
+    """Test that a 429 response is retried after retry_after seconds."""
+    responses = [
+        httpx.Response(429, json={
+            "ok": False,
+            "error_code": 429,
+            "description": "Too Many Requests",
+            "parameters": {"retry_after": 3},
+        }),
+        httpx.Response(200, json={"ok": True, "result": True}),
+    ]
+    api._api_client = httpx.AsyncClient(
+        base_url=api.base_url,
+        transport=httpx.MockTransport(lambda request: responses.pop(0)),
+    )
+    
+    with patch("pydantic_ai_telegram.api.asyncio.sleep", AsyncMock()) as mock_sleep:
+        result = await api._request("sendMessage", data={"chat_id": 1, "text": "hi"})
+    
+    assert result["result"] is True
+    mock_sleep.assert_awaited_once_with(3)
+    await api.close()
+
+
+@pytest.mark.asyncio
+async def test_request_retries_server_errors_only_when_idempotent(api):
+    """Test that 5xx responses are retried for getMe but not for sendMessage."""
+    calls: list[str] = []
+    
+    def respond(request):
+        calls.append(request.url.path.rsplit("/", 1)[-1])
+        if len(calls) == 1:
+            return httpx.Response(502)
+        return httpx.Response(200, json={"ok": True, "result": True})
+    
+    api._api_client = httpx.AsyncClient(
+        base_url=api.base_url,
+        transport=httpx.MockTransport(respond),
+    )
+    
+    with patch("pydantic_ai_telegram.api.asyncio.sleep", AsyncMock()):
+        result = await api._request("getMe")
+        assert result["result"] is True
+        assert calls == ["getMe", "getMe"]
         
+        calls.clear()
         with pytest.raises(TelegramAPIError) as exc_info:
+            await api._request("sendMessage", data={"chat_id": 1, "text": "hi"})
+    
+    assert exc_info.value.error_code == 502
+    assert calls == ["sendMessage"]
+    await api.close()
+
+
+@pytest.mark.asyncio
+async def test_request_retries_connection_errors(api):
+    """Test exponential backoff on connection errors, then giving up."""
+    def fail(request):
+        raise httpx.ConnectError("connection refused")
+    
+    api._api_client = httpx.AsyncClient(
+        base_url=api.base_url,
+        transport=httpx.MockTransport(fail),
+    )
+    
+    with patch("pydantic_ai_telegram.api.asyncio.sleep", AsyncMock()) as mock_sleep:
+        with pytest.raises(TelegramAPIError):
             await api._request("getMe")
+    
+    assert [c.args[0] for c in mock_sleep.await_args_list] == [0.5, 1.0, 2.0]
+    await api.close()
+
+
+@pytest.mark.asyncio
+async def test_download_file_to(api, tmp_path, monkeypatch):
+    """Test that a download spanning several buffered writes is saved intact."""
+    from pydantic_ai_telegram import api as api_module
+    
+    monkeypatch.setattr(api_module, "DOWNLOAD_WRITE_SIZE", 100 * 1024)
+    content = bytes(range(256)) * 1000
+    
+    api._api_client = httpx.AsyncClient(
+        transport=httpx.MockTransport(lambda request: httpx.Response(200, content=content)),
+    )
+    dest = tmp_path / "file.bin"
+    
+    await api.download_file_to("documents/file.bin", dest)
+    
+    assert dest.read_bytes() == content
+    await api.close()
+
+
+@pytest.mark.asyncio
+async def test_warmup_uses_both_pools(api):
+    """Test that warmup opens a connection on each client."""
+    calls: list[str] = []
+    
+    def handler(name):
+        def respond(request):
+            calls.append(name)
+            return httpx.Response(200, json={"ok": True, "result": {"username": "bot"}})
+        return respond
+    
+    api._api_client = httpx.AsyncClient(
+        base_url=api.base_url, transport=httpx.MockTransport(handler("api"))
+    )
+    api._poll_client = httpx.AsyncClient(
+        base_url=api.base_url, transport=httpx.MockTransport(handler("poll"))
+    )
+    
+    bot_info = await api.warmup()
+    
+    assert bot_info["result"]["username"] == "bot"
+    assert sorted(calls) == ["api", "poll"]
+    await api.close()
+
+
+@pytest.mark.asyncio
+async def test_typing_context(api):
+    """Test that the chat action is sent while the block runs and then stops."""
+    with patch.object(api, 'send_chat_action', AsyncMock()) as mock_action:
+        async with api.typing_context(123):
+            await asyncio.sleep(0)
+            mock_action.assert_awaited_once_with(123, "typing")
         
-        assert exc_info.value.error_code == 401
-        assert "Unauthorized" in str(exc_info.value)
+        await asyncio.sleep(0)
+        assert mock_action.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_typing_context_ignores_failures(api):
+    """Test that a failing chat action does not affect the wrapped block."""
+    failing = AsyncMock(side_effect=httpx.ConnectError("down"))
+    with patch.object(api, 'send_chat_action', failing):
+        async with api.typing_context(123):
+            await asyncio.sleep(0)
+    
+    failing.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_paces_acquire():
+    """Test that the bucket allows a burst and then waits for refill."""
+    bucket = AsyncTokenBucket(2, 100)
+    
+    with patch("pydantic_ai_telegram.api.asyncio.sleep", AsyncMock()) as mock_sleep:
+        await bucket.acquire()
+        await bucket.acquire()
+        mock_sleep.assert_not_awaited()
+    
+    await bucket.acquire()
+    assert not bucket.full
+
+
+def test_token_bucket_drain():
+    """Test that draining leaves the bucket empty for the given time."""
+    bucket = AsyncTokenBucket(30, 30)
+    bucket.drain(2)
+    
+    assert bucket._tokens <= -60
+    assert not bucket.full
 
 
 def test_telegram_api_error():
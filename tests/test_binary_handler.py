@@ -17,52 +17,79 @@ async def test_binary_handler_init():
 
 
 @pytest.mark.asyncio
-async def test_save_and_delete_file():
+async def test_save_and_delete_file(binary_handler):
     """Test saving and deleting a file."""
-    handler = BinaryHandler()
-    
     # Save a test file
     content = b"Test content"
-    file_path = await handler.save_file(content, suffix=".txt", prefix="test_")
+    file_path = await binary_handler.save_file(content, suffix=".txt", prefix="test_")
     
     assert file_path.exists()
     assert file_path.read_bytes() == content
     
     # Delete the file
-    await handler.delete_file(file_path)
+    await binary_handler.delete_file(file_path)
     
     assert not file_path.exists()
+    
+    # Deleting a missing file is a no-op
+    await binary_handler.delete_file(file_path)
 
 
 @pytest.mark.asyncio
-async def test_get_file_extension():
-    """Test getting file extension from MIME type."""
-    handler = BinaryHandler()
+async def test_save_stream(binary_handler):
+    """Test streaming content into a temporary file."""
+    async def downloader(path: Path) -> None:
+        path.write_bytes(b"Streamed content")
+    
+    file_path = await binary_handler.save_stream(downloader, suffix=".ogg", prefix="test_")
+    
+    assert file_path.read_bytes() == b"Streamed content"
+    await binary_handler.delete_file(file_path)
+
+
+@pytest.mark.asyncio
+async def test_save_stream_failure_cleans_up(binary_handler):
+    """Test that a failed download does not leave a temporary file behind."""
+    created: list[Path] = []
     
+    async def downloader(path: Path) -> None:
+        created.append(path)
+        raise RuntimeError("download failed")
+    
+    with pytest.raises(RuntimeError):
+        await binary_handler.save_stream(downloader, prefix="test_")
+    
+    assert not created[0].exists()
+
+
+@pytest.mark.asyncio
+async def test_get_file_extension(binary_handler):
+    """Test getting file extension from MIME type."""
     # Test with MIME type
-    assert handler.get_file_extension("image/jpeg", None) == ".jpg"
-    assert handler.get_file_extension("audio/ogg", None) == ".ogg"
+    assert binary_handler.get_file_extension("image/jpeg", None) == ".jpg"
+    assert binary_handler.get_file_extension("audio/ogg", None) == ".ogg"
+    
+    # Test mimetypes fallback for uncommon MIME types
+    assert binary_handler.get_file_extension("audio/x-wav", None) == ".wav"
     
     # Test with filename
-    assert handler.get_file_extension(None, "test.pdf") == ".pdf"
-    assert handler.get_file_extension("image/png", "test.jpg") == ".jpg"  # filename takes priority
+    assert binary_handler.get_file_extension(None, "test.pdf") == ".pdf"
+    assert binary_handler.get_file_extension("image/png", "test.jpg") == ".jpg"  # filename takes priority
     
     # Test fallback
-    assert handler.get_file_extension(None, None) == ".bin"
+    assert binary_handler.get_file_extension(None, None) == ".bin"
 
 
 @pytest.mark.asyncio
-async def test_cleanup_old_files():
+async def test_cleanup_old_files(binary_handler):
     """Test cleaning up old files."""
-    handler = BinaryHandler()
-    
     # Create a test file
     content = b"Test"
-    file_path = await handler.save_file(content, prefix="telegram_bot_cleanup_")
+    file_path = await binary_handler.save_file(content, prefix="telegram_bot_cleanup_")
     
     # Cleanup with 0 seconds max age (should delete everything)
-    deleted = await handler.cleanup_old_files(max_age_seconds=0)
+    deleted = await binary_handler.cleanup_old_files(max_age_seconds=0)
     
-    assert deleted >= 1
+    assert deleted == 1
     assert not file_path.exists()
 
@@ -2,18 +2,31 @@
 Tests for TelegramAgent.
 """
 
+import asyncio
+from typing import Optional
+
 import pytest
 from unittest.mock import Mock, AsyncMock, patch
 
-from pydantic_ai_telegram.bot import TelegramAgent
-from pydantic_ai_telegram.models import TelegramMessage, TelegramChat, TelegramUser
+from pydantic_ai_telegram.bot import MAX_PENDING_UPDATES, TelegramAgent
+from pydantic_ai_telegram.models import (
+    TelegramMessage,
+    TelegramChat,
+    TelegramUser,
+    TelegramUpdate,
+    MessageContent,
+)
 
 
 @pytest.fixture
 def mock_agent():
     """Create a mock Pydantic AI agent."""
     agent = Mock()
-    agent.run = AsyncMock(return_value=Mock(output="Test response", all_messages=Mock(return_value=[])))
+    agent.run = AsyncMock(return_value=Mock(
+        output="Test response",
+        all_messages=Mock(return_value=[]),
+        new_messages=Mock(return_value=[]),
+    ))
     return agent
 
 
@@ -44,10 +57,10 @@ def test_parse_chat_ids():
     agent = Mock()
     
     bot = TelegramAgent(bot_token="test", agent=agent, allowed_chat_ids="123,456,789")
-    assert bot.allowed_chat_ids == [123, 456, 789]
+    assert bot.allowed_chat_ids == frozenset({123, 456, 789})
     
     bot = TelegramAgent(bot_token="test", agent=agent, allowed_chat_ids=[111, 222])
-    assert bot.allowed_chat_ids == [111, 222]
+    assert bot.allowed_chat_ids == frozenset({111, 222})
     
     bot = TelegramAgent(bot_token="test", agent=agent, allowed_chat_ids=None)
     assert bot.allowed_chat_ids is None
@@ -58,10 +71,13 @@ def test_parse_usernames():
     agent = Mock()
     
     bot = TelegramAgent(bot_token="test", agent=agent, allowed_usernames="alice,bob")
-    assert bot.allowed_usernames == ["alice", "bob"]
+    assert bot.allowed_usernames == frozenset({"alice", "bob"})
     
     bot = TelegramAgent(bot_token="test", agent=agent, allowed_usernames="@alice,@bob")
-    assert bot.allowed_usernames == ["alice", "bob"]
+    assert bot.allowed_usernames == frozenset({"alice", "bob"})
+    
+    bot = TelegramAgent(bot_token="test", agent=agent, allowed_usernames=["@Alice", "bob"])
+    assert bot.allowed_usernames == frozenset({"alice", "bob"})
 
 
 def test_is_authorized_no_restrictions(telegram_agent):
@@ -130,3 +146,247 @@ def test_is_authorized_with_username_restriction(mock_agent):
     assert bot.is_authorized(allowed_message) is True
     assert bot.is_authorized(denied_message) is False
 
+
+@pytest.mark.asyncio
+async def test_handle_command(telegram_agent):
+    """Test command dispatch, including unknown commands."""
+    with patch.object(telegram_agent, "_send", AsyncMock()) as mock_send, \
+            patch.object(telegram_agent.conversation_manager, "reset_conversation") as mock_reset:
+        await telegram_agent.handle_command("reset", 123, 1)
+        mock_reset.assert_called_once_with(123)
+        assert "cleared" in mock_send.await_args.args[1]
+        
+        await telegram_agent.handle_command("bogus", 123, 2)
+        assert "Unknown command: /bogus" in mock_send.await_args.args[1]
+
+
+def make_update(update_id: int, chat_id: int, text: Optional[str] = None) -> TelegramUpdate:
+    """Create a text update for a chat."""
+    return TelegramUpdate(
+        update_id=update_id,
+        message=TelegramMessage(
+            message_id=update_id,
+            date=1234567890,
+            chat=TelegramChat(id=chat_id, type="private"),
+            text=text or f"Message {update_id}",
+        ),
+    )
+
+
+@pytest.mark.asyncio
+async def test_dispatch_update_per_chat_order(telegram_agent):
+    """Test that chats are processed concurrently and in order within a chat."""
+    events: list[tuple[str, int]] = []
+    release_chat_1 = asyncio.Event()
+    
+    async def process_update(update):
+        events.append(("start", update.update_id))
+        if update.message.chat.id == 1:
+            await release_chat_1.wait()
+        events.append(("end", update.update_id))
+    
+    with patch.object(telegram_agent, "process_update", side_effect=process_update):
+        for update_id, chat_id in [(1, 1), (2, 1), (3, 2)]:
+            await telegram_agent._dispatch_update(make_update(update_id, chat_id))
+        
+        # Chat 2 finishes while chat 1 is still blocked on its first update
+        await asyncio.sleep(0)
+        assert ("end", 3) in events
+        assert ("start", 2) not in events
+        
+        release_chat_1.set()
+        await asyncio.gather(*telegram_agent._chat_workers.values())
+    
+    assert [e for e in events if e[1] in (1, 2)] == [
+        ("start", 1), ("end", 1), ("start", 2), ("end", 2)
+    ]
+    assert telegram_agent._chat_workers == {}
+    assert telegram_agent._chat_queues == {}
+
+
+@pytest.mark.asyncio
+async def test_dispatch_update_back_pressure(telegram_agent):
+    """Test that dispatch waits once too many updates are pending."""
+    telegram_agent._pending_updates = asyncio.Semaphore(1)
+    release = asyncio.Event()
+    
+    async def process_update(update):
+        await release.wait()
+    
+    with patch.object(telegram_agent, "process_update", side_effect=process_update):
+        await telegram_agent._dispatch_update(make_update(1, 1))
+        second = asyncio.create_task(telegram_agent._dispatch_update(make_update(2, 2)))
+        
+        await asyncio.sleep(0)
+        assert not second.done()
+        assert 2 not in telegram_agent._chat_queues
+        
+        release.set()
+        await second
+        await asyncio.gather(*telegram_agent._chat_workers.values())
+    
+    assert telegram_agent._chat_workers == {}
+
+
+@pytest.mark.asyncio
+async def test_process_message_command(telegram_agent):
+    """Test that the command name is taken up to the first whitespace."""
+    for text, command in [("/Help", "help"), ("/reset now", "reset"), ("/tokens\nx", "tokens"), ("/", "")]:
+        message = TelegramMessage(
+            message_id=1,
+            date=1234567890,
+            chat=TelegramChat(id=123, type="private"),
+            text=text,
+        )
+        with patch.object(telegram_agent, "handle_command", AsyncMock()) as mock_handle:
+            await telegram_agent.process_message(message)
+            mock_handle.assert_awaited_once_with(command, 123, 1)
+
+
+@pytest.mark.asyncio
+async def test_get_agent_response_appends_new_messages(telegram_agent, mock_agent):
+    """Test that only the run's new messages are appended to the history."""
+    telegram_agent.conversation_manager.set_pydantic_history(123, ["old"])
+    mock_agent.run.return_value.new_messages.return_value = ["request", "response"]
+    
+    response = await telegram_agent.get_agent_response(123, MessageContent(text="Hi"))
+    
+    assert response == "Test response"
+    assert mock_agent.run.await_args.kwargs["message_history"] is telegram_agent.conversation_manager.get_pydantic_history(123)
+    assert list(telegram_agent.conversation_manager.get_pydantic_history(123)) == ["old", "request", "response"]
+
+
+@pytest.mark.asyncio
+async def test_delete_in_background(telegram_agent):
+    """Test that temp files are deleted by a tracked background task."""
+    with patch.object(telegram_agent.binary_handler, "delete_file", AsyncMock()) as mock_delete:
+        telegram_agent._delete_in_background("/tmp/file.jpg")
+        assert len(telegram_agent._pending_deletes) == 1
+        
+        await asyncio.gather(*telegram_agent._pending_deletes)
+        await asyncio.sleep(0)
+    
+    mock_delete.assert_awaited_once_with("/tmp/file.jpg")
+    assert telegram_agent._pending_deletes == set()
+
+
+@pytest.mark.asyncio
+async def test_stop_cancels_polling(telegram_agent):
+    """Test that stop() cancels a pending long poll and closes resources."""
+    async def get_updates(**kwargs):
+        await asyncio.Event().wait()
+    
+    with patch.object(telegram_agent.api, "warmup", AsyncMock(return_value={"result": {"username": "bot"}})), \
+            patch.object(telegram_agent.api, "get_updates", side_effect=get_updates), \
+            patch.object(telegram_agent.api, "close", AsyncMock()) as mock_close:
+        start = asyncio.create_task(telegram_agent.start())
+        await asyncio.sleep(0.01)
+        
+        await telegram_agent.stop()
+        await asyncio.wait_for(start, 1)
+    
+    assert telegram_agent._polling_task.cancelled()
+    assert telegram_agent._cleanup_task.cancelled()
+    mock_close.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_prepare_agent_message_does_not_copy_file_data(telegram_agent):
+    """Test that downloaded bytes reach BinaryContent without being copied."""
+    data = b"\xff\xd8" * 1024
+    content = MessageContent(text="Look", file_data=data, mime_type="image/jpeg")
+    
+    parts = await telegram_agent._prepare_agent_message(content)
+    
+    assert parts[0] == "Look"
+    assert parts[1].data is data
+    assert parts[1].media_type == "image/jpeg"
+
+
+def test_setup_transcription(mock_agent, monkeypatch):
+    """Test transcription setup by name and that handlers share the service."""
+    from pydantic_ai_telegram.transcription.base import TranscriptionService
+    
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    for name in ("none", "openai", "bogus"):
+        bot = TelegramAgent(bot_token="test", agent=mock_agent, transcription_service=name)
+        assert bot.transcription_service is None
+        assert bot.voice_handler.transcription_service is None
+    
+    service = Mock(spec=TranscriptionService)
+    bot = TelegramAgent(bot_token="test", agent=mock_agent, transcription_service=service)
+    assert bot.voice_handler.transcription_service is service
+    assert bot.audio_handler.transcription_service is service
+
+
+@pytest.mark.asyncio
+async def test_warmup_transcription_logs_failure(mock_agent):
+    """Test that a failed transcription warmup doesn't raise."""
+    from pydantic_ai_telegram.transcription.base import TranscriptionService
+    
+    service = Mock(spec=TranscriptionService)
+    service.warmup = AsyncMock(side_effect=RuntimeError("no model"))
+    bot = TelegramAgent(bot_token="test", agent=mock_agent, transcription_service=service)
+    
+    await bot._warmup_transcription()
+    
+    service.warmup.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_chat_worker_merges_split_text(telegram_agent):
+    """Test that a long text and its continuation reach the agent as one message."""
+    processed: list[TelegramUpdate] = []
+    
+    async def process_update(update):
+        processed.append(update)
+    
+    first = "a" * 4096
+    with patch.object(telegram_agent, "process_update", side_effect=process_update):
+        await telegram_agent._dispatch_update(make_update(1, 1, first))
+        await asyncio.sleep(0)
+        await telegram_agent._dispatch_update(make_update(2, 1, "tail"))
+        await telegram_agent._dispatch_update(make_update(3, 1, "/help"))
+        await asyncio.gather(*telegram_agent._chat_workers.values())
+    
+    assert [u.update_id for u in processed] == [2, 3]
+    assert processed[0].message.text == first + "\ntail"
+    assert processed[0].message.message_id == 2
+    assert telegram_agent._pending_updates._value == MAX_PENDING_UPDATES
+
+
+@pytest.mark.asyncio
+async def test_merge_split_text_keeps_update_arriving_at_timeout(telegram_agent):
+    """Test that an update dequeued just as the merge window times out is kept."""
+    queue: asyncio.Queue[TelegramUpdate] = asyncio.Queue()
+    first = "a" * 4096
+    real_wait = asyncio.wait
+    
+    async def wait_then_time_out(tasks, timeout=None):
+        # The continuation arrives and is dequeued, but the wait reports a timeout
+        queue.put_nowait(make_update(2, 1, "tail"))
+        await asyncio.sleep(0)
+        assert all(task.done() for task in tasks)
+        return set(), set(tasks)
+    
+    with patch("pydantic_ai_telegram.bot.asyncio.wait", side_effect=wait_then_time_out):
+        update, merged, held = await telegram_agent._merge_split_text(
+            make_update(1, 1, first), queue
+        )
+    
+    assert asyncio.wait is real_wait
+    assert merged == 2
+    assert held is None
+    assert update.message.text == first + "\ntail"
+
+
+@pytest.mark.asyncio
+async def test_prepare_agent_message_reads_streamed_file(telegram_agent, tmp_path):
+    """Test that a file streamed to disk is read for the agent."""
+    photo = tmp_path / "photo.jpg"
+    photo.write_bytes(b"\xff\xd8\xff")
+    content = MessageContent(file_path=str(photo), file_type="image", mime_type="image/jpeg")
+    
+    parts = await telegram_agent._prepare_agent_message(content)
+    
+    assert parts[0].data == b"\xff\xd8\xff"
@@ -37,6 +37,7 @@ def test_add_message():
     history = manager.get_history(123)
     assert len(history) == 1
     assert history[0].content == "Hello"
+    assert manager.get_or_create_conversation(123).last_updated == msg.timestamp
 
 
 def test_reset_conversation():
@@ -77,6 +78,7 @@ def test_max_history_limit():
     assert len(history) == 3
     assert history[0].content == "Message 2"
     assert history[-1].content == "Message 4"
+    assert manager.get_token_count(123) == sum(msg.tokens for msg in history)
 
 
 def test_conversation_summary():
@@ -93,6 +95,16 @@ def test_conversation_summary():
     assert summary["total_tokens"] > 0
 
 
+def test_conversation_summary_json():
+    """Test that the JSON summary matches the dictionary summary."""
+    import orjson
+    
+    manager = ConversationManager()
+    manager.add_message(123, "user", "Hello")
+    
+    assert orjson.loads(manager.get_conversation_summary_json(123)) == manager.get_conversation_summary(123)
+
+
 def test_list_active_conversations():
     """Test listing active conversations."""
     manager = ConversationManager()
@@ -106,3 +118,119 @@ def test_list_active_conversations():
     assert 456 in active
     assert len(active) == 2
 
+
+
+def test_extend_pydantic_history_keeps_system_prompt():
+    """Test that pydantic history is bounded and keeps the system prompt."""
+    from pydantic_ai.messages import ModelRequest, SystemPromptPart, UserPromptPart
+    
+    manager = ConversationManager(max_history=2)
+    system = ModelRequest(parts=[SystemPromptPart(content="Be nice"), UserPromptPart(content="Hi")])
+    
+    manager.extend_pydantic_history(123, [system, "second"])
+    manager.extend_pydantic_history(123, ["third", "fourth"])
+    
+    history = manager.get_pydantic_history(123)
+    assert list(history) == [system, "third", "fourth"]
+    assert manager.get_message_count(123) == 3
+    assert manager.get_token_count(123) == manager._count_message_tokens(system)
+    
+    manager.set_pydantic_history(123, ["fifth", "sixth", "seventh"])
+    assert list(manager.get_pydantic_history(123)) == ["sixth", "seventh"]
+    assert manager.get_token_count(123) == 0
+
+
+def test_add_message_with_pydantic_history_is_not_stored():
+    """Test that add_message skips bookkeeping once pydantic-ai owns the history."""
+    from unittest.mock import patch
+    
+    manager = ConversationManager()
+    manager.set_pydantic_history(123, ["first message"])
+    
+    with patch.object(manager, "_count_tokens") as mock_count:
+        msg = manager.add_message(123, "user", "Hello")
+    
+    mock_count.assert_not_called()
+    assert msg.content == "Hello"
+    assert manager.get_history(123) == []
+    assert manager.get_message_count(123) == 1
+
+
+def test_text_token_counts_are_cached(monkeypatch):
+    """Test that counting the same text twice encodes it once."""
+    from unittest.mock import Mock
+    from pydantic_ai_telegram import conversation
+    
+    encoding = Mock()
+    encoding.encode.return_value = [1, 2, 3]
+    monkeypatch.setattr(conversation, "get_tokenizer", Mock(return_value=encoding))
+    conversation._encode_len.cache_clear()
+    
+    manager = ConversationManager()
+    manager.encoding = encoding
+    
+    assert manager._count_text_tokens("Hello again") == 3
+    assert manager._count_text_tokens("Hello again") == 3
+    encoding.encode.assert_called_once_with("Hello again")
+    
+    conversation._encode_len.cache_clear()
+
+
+def test_long_text_token_counts_are_cached_by_digest(monkeypatch):
+    """Test that long texts are cached by digest rather than kept as keys."""
+    from unittest.mock import Mock
+    from pydantic_ai_telegram import conversation
+    
+    encoding = Mock()
+    encoding.encode.return_value = [1, 2, 3]
+    monkeypatch.setattr(conversation, "get_tokenizer", Mock(return_value=encoding))
+    monkeypatch.setattr(conversation, "_digest_token_counts", conversation.OrderedDict())
+    
+    manager = ConversationManager()
+    manager.encoding = encoding
+    text = "x" * conversation.DIGEST_KEY_MIN_LENGTH
+    
+    assert manager._count_text_tokens(text) == 3
+    assert manager._count_text_tokens("".join(["x"] * len(text))) == 3
+    encoding.encode.assert_called_once()
+    
+    (key,) = conversation._digest_token_counts
+    assert text not in key
+
+
+def test_set_pydantic_history_reuses_token_counts():
+    """Test that replacing the history only tokenizes new messages."""
+    from unittest.mock import patch
+    
+    manager = ConversationManager()
+    first, second = ["first message"], ["second message"]
+    manager.set_pydantic_history(123, [first])
+    
+    with patch.object(manager, "_count_message_tokens", return_value=7) as mock_count:
+        manager.set_pydantic_history(123, [first, second])
+    
+    mock_count.assert_called_once_with(second)
+    assert manager.get_token_count(123) == manager._count_message_tokens(first) + 7
+
+
+def test_many_texts_are_batch_encoded():
+    """Test that multimodal content with many text parts is encoded in one batch."""
+    from unittest.mock import Mock
+    
+    manager = ConversationManager()
+    manager.encoding = Mock()
+    manager.encoding.encode_batch.return_value = [[1, 2]] * 8
+    
+    assert manager._count_tokens([f"part {i}" for i in range(8)] + [{"image": "x"}]) == 116
+    manager.encoding.encode_batch.assert_called_once()
+
+
+def test_empty_text_skips_encoder():
+    """Test that empty text counts as zero tokens without encoding."""
+    from unittest.mock import Mock
+    
+    manager = ConversationManager()
+    manager.encoding = Mock()
+    
+    assert manager._count_text_tokens("") == 0
+    manager.encoding.encode.assert_not_called()
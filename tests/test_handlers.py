@@ -0,0 +1,53 @@
+"""
+Tests for message handlers.
+"""
+
+import pytest
+from unittest.mock import Mock, AsyncMock
+
+from pydantic_ai_telegram.handlers import VoiceHandler, get_media_type_from_mime
+from pydantic_ai_telegram.models import TelegramMessage, TelegramFile
+
+
+@pytest.fixture
+def voice_message():
+    """Create a voice message."""
+    return TelegramMessage.model_validate({
+        "message_id": 1,
+        "date": 1234567890,
+        "chat": {"id": 123, "type": "private"},
+        "voice": {
+            "file_id": "file-1",
+            "file_unique_id": "unique-1",
+            "duration": 3,
+            "mime_type": "audio/ogg",
+        },
+    })
+
+
+@pytest.mark.asyncio
+async def test_voice_transcription_is_cached(voice_message, binary_handler, tmp_path):
+    """Test that the same voice file is downloaded and transcribed once."""
+    api = Mock()
+    api.get_file = AsyncMock(return_value=TelegramFile(
+        file_id="file-1", file_unique_id="unique-1", file_path="voice/file.oga"
+    ))
+    api.download_file_to = AsyncMock()
+    transcription = Mock()
+    transcription.transcribe = AsyncMock(return_value="hello")
+    
+    handler = VoiceHandler(api, binary_handler, transcription)
+    
+    first = await handler.handle(voice_message)
+    second = await handler.handle(voice_message)
+    
+    assert first.text == second.text == "hello"
+    transcription.transcribe.assert_awaited_once()
+    api.download_file_to.assert_awaited_once()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_media_type_from_mime():
+    """Test that MIME types map to interned media types."""
+    assert get_media_type_from_mime(None) == "application/octet-stream"
+    assert get_media_type_from_mime("".join(["image/", "png"])) is get_media_type_from_mime("image/png")
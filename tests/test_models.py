@@ -10,6 +10,7 @@ from pydantic_ai_telegram.models import (
     TelegramChat,
     TelegramMessage,
     TelegramUpdate,
+    parse_update_json,
     BotConfig,
     ConversationMessage,
     ConversationState,
@@ -85,6 +86,27 @@ def test_telegram_update():
     assert update.update_id == 100
     assert update.message is not None
     assert update.message.text == "Test"
+    assert update.effective_message is update.message
+    
+    edited = TelegramUpdate(update_id=101, edited_message=update_data["message"])
+    assert edited.effective_message is edited.edited_message
+    assert TelegramUpdate(update_id=102).effective_message is None
+    
+    # Follows the fields after copies and reassignment
+    assert update.model_copy(update={"message": None}).effective_message is None
+    edited.edited_message = None
+    assert edited.effective_message is None
+
+
+def test_parse_update_json():
+    """Test parsing an update directly from JSON."""
+    update = parse_update_json(
+        b'{"update_id": 7, "message": {"message_id": 1, "date": 1234567890,'
+        b' "chat": {"id": 123, "type": "private"}, "text": "Hi"}}'
+    )
+    
+    assert update.update_id == 7
+    assert update.effective_message.text == "Hi"
 
 
 def test_bot_config():
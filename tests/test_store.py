@@ -0,0 +1,101 @@
+"""
+Tests for conversation stores.
+"""
+
+import pytest
+from pydantic_ai.messages import ModelRequest, ModelResponse, SystemPromptPart, TextPart, UserPromptPart
+
+from pydantic_ai_telegram.conversation import ConversationManager
+from pydantic_ai_telegram.store import SqliteStore
+
+
+def make_history():
+    """Create a short pydantic-ai history."""
+    return [
+        ModelRequest(parts=[SystemPromptPart(content="Be nice"), UserPromptPart(content="Hi")]),
+        ModelResponse(parts=[TextPart(content="Hello!")]),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_sqlite_store_round_trip(tmp_path):
+    """Test that a conversation survives a new manager and store."""
+    store = SqliteStore(tmp_path / "conversations.db")
+    manager = ConversationManager(store=store)
+    manager.set_pydantic_history(123, make_history())
+    await manager.save_conversation(123)
+    token_count = manager.get_token_count(123)
+    store.close()
+    
+    store = SqliteStore(tmp_path / "conversations.db")
+    manager = ConversationManager(store=store)
+    
+    await manager.load_conversation(123)
+    assert 123 in manager.conversations
+    history = manager.get_pydantic_history(123)
+    assert len(history) == 2
+    assert history[1].parts[0].content == "Hello!"
+    assert manager.get_token_count(123) == token_count
+    assert manager.list_active_conversations() == [123]
+    store.close()
+
+
+@pytest.mark.asyncio
+async def test_sqlite_store_reset_deletes(tmp_path):
+    """Test that resetting a conversation removes it from the store."""
+    store = SqliteStore(tmp_path / "conversations.db")
+    manager = ConversationManager(store=store)
+    manager.set_pydantic_history(123, make_history())
+    await manager.save_conversation(123)
+    assert store.chat_ids() == [123]
+    
+    manager.reset_conversation(123)
+    await manager.save_conversation(123)
+    
+    assert store.load(123) is None
+    assert store.chat_ids() == []
+    store.close()
+
+
+@pytest.mark.asyncio
+async def test_unstored_messages_are_not_evicted(tmp_path, monkeypatch):
+    """Test that conversations with messages or changes the store lacks stay in memory."""
+    from pydantic_ai_telegram import conversation
+    
+    monkeypatch.setattr(conversation, "STORE_CACHE_SIZE", 1)
+    store = SqliteStore(tmp_path / "conversations.db")
+    manager = ConversationManager(store=store)
+    
+    manager.add_message(1, "user", "Hello")
+    manager.set_pydantic_history(2, make_history())
+    manager.get_or_create_conversation(3)
+    assert 2 in manager.conversations
+    
+    await manager.save_conversation(2)
+    manager.get_or_create_conversation(4)
+    
+    assert 1 in manager.conversations
+    assert 2 not in manager.conversations
+    assert manager.get_history(1)[0].content == "Hello"
+    store.close()
+
+
+@pytest.mark.asyncio
+async def test_pinned_conversation_is_not_evicted(tmp_path, monkeypatch):
+    """Test that a conversation pinned for a turn stays in memory until unpinned."""
+    from pydantic_ai_telegram import conversation
+    
+    monkeypatch.setattr(conversation, "STORE_CACHE_SIZE", 1)
+    store = SqliteStore(tmp_path / "conversations.db")
+    manager = ConversationManager(store=store)
+    manager.set_pydantic_history(1, make_history())
+    await manager.save_conversation(1)
+    
+    await manager.load_conversation(1, pin=True)
+    await manager.load_conversation(2)
+    assert 1 in manager.conversations
+    
+    manager.unpin(1)
+    await manager.load_conversation(3)
+    assert 1 not in manager.conversations
+    store.close()